@@ -0,0 +1,521 @@
+# File: benchmark.py
+"""
+Benchmarks for the processing engines and the end-to-end pipeline.
+
+    python benchmark.py identify                 # all products_*.csv
+    python benchmark.py identify products_electronics.csv --repeat 5
+    python benchmark.py generate synthetic.csv --scale 100
+    python benchmark.py suite --scale 10 --latency-ms 40 --failure-rate 0.02 --output bench.json
+    python benchmark.py startup --import-budget 2 --render-budget 6
+
+`suite` generates a synthetic category CSV, serves its product images from a
+local HTTP server instead of Amazon's CDN, and times every engine plus the
+whole pipeline. Results are printed and, with --output, written as JSON so
+runs can be compared.
+
+`startup` times `import prism_app` and the app's first render (through
+Streamlit's AppTest) in fresh interpreters, and exits non-zero if either goes
+over its budget or the import pulls in the image-analysis stack.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from data_pipeline import clean_products, process_csv, read_products
+from download_scheduler import DownloadScheduler
+from image_score_cache import ImageScoreCache
+from item_identifier import ItemIdentifier
+from listing_quality_evaluator import ListingQualityEvaluator
+from pipeline_metrics import PipelineMetrics
+from prism_score_evaluator import PrismScoreEvaluator
+
+# Row count of the largest category CSV we currently scrape; --scale multiplies it.
+BASE_ROWS = 6293
+
+def _best_time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # No /proc: fall back to the process-wide high-water mark (KB on Linux, bytes on macOS).
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if platform.system() == "Darwin" else peak * 1024
+
+def _measure(fn, sample_interval: float = 0.005) -> dict:
+    """
+    Runs `fn` once and returns its wall time, plus the peak resident memory
+    seen by a sampling thread and how far that peak rose above the starting
+    RSS. Sampling, unlike tracemalloc, leaves threaded stages at full speed.
+    """
+    start_rss = _rss_bytes()
+    peak = [start_rss]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(sample_interval):
+            peak[0] = max(peak[0], _rss_bytes())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    try:
+        fn()
+        seconds = time.perf_counter() - started
+    finally:
+        done.set()
+        sampler.join()
+    peak[0] = max(peak[0], _rss_bytes())
+    return {"seconds": seconds, "peak_rss_mb": peak[0] / 1e6, "rss_growth_mb": (peak[0] - start_rss) / 1e6}
+
+def bench_identify(csv_paths, repeat: int = 3) -> list:
+    """
+    Times `identify` per title against `identify_many` with a cold and a warm
+    memo, and reports titles per second for each CSV.
+    """
+    results = []
+    for csv_path in csv_paths:
+        titles = pd.read_csv(csv_path, usecols=['Title'])['Title'].tolist()
+        engine = ItemIdentifier()
+        per_title = _best_time(lambda: [engine.identify(title) for title in titles], repeat)
+        cold = _best_time(lambda: ItemIdentifier().identify_many(titles), repeat)
+        engine.identify_many(titles)
+        warm = _best_time(lambda: engine.identify_many(titles), repeat)
+        results.append({
+            "csv": csv_path,
+            "titles": len(titles),
+            "identify_titles_per_s": len(titles) / per_title,
+            "identify_many_cold_titles_per_s": len(titles) / cold,
+            "identify_many_warm_titles_per_s": len(titles) / warm,
+        })
+    return results
+
+# --- Synthetic data ---
+_BRANDS = ["Boldfit", "Strauss", "Nivia", "boAt", "Bosch", "Stanley", "Amazon", "Philips",
+           "Cosco", "Vector X", "Lifelong", "Kreo", "Taparia", "Spigen", "Portronics"]
+_ITEMS = ["Yoga Mat", "Skipping Rope", "Resistance Band", "Hex Dumbbell", "Screwdriver Set",
+          "Drill Machine", "Car Vacuum Cleaner", "Helmet Lock", "Bluetooth Neckband",
+          "Power Bank", "Tyre Inflator", "Gym Gloves", "Badminton Racquet", "Measuring Tape",
+          "Phone Holder", "Wall Hook", "Cricket Bat", "Water Bottle", "LED Strip", "Extension Board"]
+_ADJECTIVES = ["Premium", "Heavy Duty", "Portable", "Anti Slip", "Rechargeable", "Waterproof",
+               "Stylish", "Adjustable", "Multi-Purpose", "Compact"]
+_EXTRAS = ["for Men and Women", "with Carry Bag", "Pack of 2", "(Black)", "| 1 Year Warranty",
+           "for Home Gym", "Ideal for Everyday Use", "- Blue", "XL Size", "with Mic"]
+_SALES = ["50+ bought in past month", "100+ bought in past month", "200+ bought in past month",
+          "300+ bought in past month", "500+ bought in past month", "1K+ bought in past month",
+          "2K+ bought in past month", "5K+ bought in past month", "10K+ bought in past month"]
+
+def _synthetic_chunk(rng: np.random.Generator, start: int, rows: int, image_base_url: str,
+                     unique_images: int) -> pd.DataFrame:
+    def pick(choices):
+        return np.asarray(choices, dtype=object)[rng.integers(0, len(choices), rows)]
+
+    image_ids = rng.integers(0, unique_images, rows) if unique_images else np.arange(start, start + rows)
+    images = [f"{image_base_url}/images/I/{image_id:011d}._AC_UL320_.jpg" for image_id in image_ids]
+    model_numbers = [f"X{n}" for n in rng.integers(10, 9999, rows)]
+    titles = [" ".join(parts) for parts in zip(pick(_BRANDS), pick(_ADJECTIVES), pick(_ITEMS),
+                                               model_numbers, pick(_EXTRAS))]
+
+    prices = np.round(rng.lognormal(6.0, 0.9, rows)).astype(int)
+    ratings = np.round(rng.uniform(2.5, 5.0, rows), 1)
+    reviews = np.round(rng.lognormal(5.0, 1.8, rows)).astype(int)
+    sales = pick(_SALES)
+    missing = rng.random((4, rows))
+
+    return pd.DataFrame({
+        "Image": images,
+        "Title": titles,
+        "Price": [f"{p:,}" if m > 0.005 else "" for p, m in zip(prices, missing[0])],
+        "Ratings": [f"{r:.1f} out of 5 stars" if m > 0.03 else "" for r, m in zip(ratings, missing[1])],
+        "Review": [f"{r:,}" if m > 0.03 else "" for r, m in zip(reviews, missing[2])],
+        "Monthly Sales": [s if m > 0.25 else "" for s, m in zip(sales, missing[3])],
+    })
+
+def generate_products_csv(path: str, rows: int, image_base_url: str = "http://127.0.0.1:8000",
+                          unique_images: int = 0, seed: int = 0, chunk_rows: int = 100_000) -> str:
+    """
+    Writes a synthetic category CSV with the scraped `Image,Title,Price,Ratings,
+    Review,Monthly Sales` schema and value formats, in chunks so that very large
+    files need little memory. `unique_images` > 0 makes rows share that many
+    image URLs; by default every row has its own image.
+    """
+    rng = np.random.default_rng(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for start in range(0, rows, chunk_rows):
+            chunk = _synthetic_chunk(rng, start, min(chunk_rows, rows - start), image_base_url, unique_images)
+            chunk.to_csv(f, index=False, header=(start == 0))
+    return path
+
+class ImageServer:
+    """
+    Local stand-in for the image CDN. Serves generated product photos (a dark
+    object on a white background, with coverage chosen by a hash of the path)
+    after `latency_ms` +/- `jitter_ms`, and answers 503 for a `failure_rate`
+    fraction of requests. Like the CDN, it scales images down to the size in
+    an `_AC_UL320_`-style token and answers conditional requests with 304.
+    With `capacity` set, requests beyond that many in flight are throttled
+    with 429.
+    """
+    LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, failure_rate: float = 0.0,
+                 size: int = 320, variants: int = 32, seed: int = 0, capacity: int = 0):
+        import cv2
+
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.size = size
+        self.capacity = capacity
+        self.requests = 0
+        self.failures = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._images = []
+        self._renditions = {}
+        for i in range(variants):
+            coverage = 0.2 + 0.75 * i / max(1, variants - 1)
+            img = np.full((size, size, 3), 255, np.uint8)
+            side = int(size * coverage ** 0.5)
+            offset = (size - side) // 2
+            img[offset:offset + side, offset:offset + side] = (40 + i, 60, 90)
+            self._images.append(img)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _rendition(self, variant: int, size: int) -> tuple:
+        """
+        The encoded image and its ETag for one variant at one size, made once.
+        """
+        import cv2
+
+        key = (variant, size)
+        with self._lock:
+            if key not in self._renditions:
+                img = self._images[variant]
+                if size < self.size:
+                    img = cv2.resize(img, (size, size), interpolation=cv2.INTER_AREA)
+                body = cv2.imencode(".jpg", img)[1].tobytes()
+                self._renditions[key] = (body, f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"')
+            return self._renditions[key]
+
+    def _respond(self, path: str, if_none_match: str = None):
+        """
+        Returns `(status, body, etag)` for a request.
+        """
+        with self._lock:
+            self.requests += 1
+            if self.capacity and self.in_flight >= self.capacity:
+                self.throttled += 1
+                return 429, b"", None
+            self.in_flight += 1
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            failed = self._random.random() < self.failure_rate
+            self.failures += failed
+        try:
+            time.sleep(delay)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        if failed:
+            return 503, b"", None
+        # The image is chosen by the path without its size token, so every
+        # rendition of a URL shows the same product.
+        token = re.search(r"\._AC_[A-Z]{2}(\d+)_", path)
+        size = min(self.size, int(token.group(1))) if token else self.size
+        base_path = re.sub(r"\._AC_[A-Z]{2}\d+_", "", path)
+        digest = int.from_bytes(hashlib.blake2b(base_path.encode(), digest_size=4).digest(), "big")
+        body, etag = self._rendition(digest % len(self._images), size)
+        if if_none_match == etag:
+            with self._lock:
+                self.not_modified += 1
+            return 304, b"", etag
+        with self._lock:
+            self.bytes_sent += len(body)
+        return 200, body, etag
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                status, body, etag = server._respond(self.path, self.headers.get("If-None-Match"))
+                self.send_response(status)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                    self.send_header("Last-Modified", server.LAST_MODIFIED)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+def run_suite(rows: int, latency_ms: float = 20, jitter_ms: float = 10, failure_rate: float = 0.01,
+              unique_images: int = 0, max_workers: int = 16, seed: int = 0, keep_csv: str = None,
+              image_size: int = 100, capacity: int = 0) -> dict:
+    """
+    Generates a synthetic category, then benchmarks each engine and the whole
+    pipeline against the local image server. Listing quality is also measured
+    at the smaller `image_size` rendition, and with every cached rating
+    expired so that it is revalidated with conditional requests.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, \
+            ImageServer(latency_ms, jitter_ms, failure_rate, seed=seed, capacity=capacity) as server:
+        csv_path = keep_csv or os.path.join(tmp, "products_synthetic.csv")
+        results["generate"] = _measure(lambda: generate_products_csv(
+            csv_path, rows, server.url, unique_images=unique_images, seed=seed))
+        results["generate"]["csv_mb"] = os.path.getsize(csv_path) / 1e6
+
+        df = read_products(csv_path)
+        results["read_csv"] = _measure(lambda: read_products(csv_path))
+        results["clean"] = _measure(lambda: clean_products(df))
+        results["identify"] = _measure(lambda: ItemIdentifier().identify_many(df['Title']))
+        df['Identified Item'] = ItemIdentifier().identify_many(df['Title'])
+
+        # Each measurement gets its own scheduler, so host limits learned in one do not carry over.
+        quality_engine = ListingQualityEvaluator(max_workers=max_workers, use_cache=False, scheduler=DownloadScheduler())
+        labels = []
+        sent = server.bytes_sent
+        results["listing_quality"] = _measure(lambda: labels.extend(quality_engine.get_scores(df['Image'])))
+        results["listing_quality"]["download_mb"] = (server.bytes_sent - sent) / 1e6
+        df['Listing Quality'] = labels
+        results["listing_quality"]["error_rate"] = labels.count("Error") / max(1, len(labels))
+
+        if image_size:
+            small_engine = ListingQualityEvaluator(max_workers=max_workers, use_cache=False, rendition_size=image_size,
+                                                   scheduler=DownloadScheduler())
+            small_labels = []
+            sent = server.bytes_sent
+            results["listing_quality_small"] = _measure(lambda: small_labels.extend(small_engine.get_scores(df['Image'])))
+            results["listing_quality_small"]["download_mb"] = (server.bytes_sent - sent) / 1e6
+            both = [(a, b) for a, b in zip(labels, small_labels) if "Error" not in (a, b)]
+            results["listing_quality_small"]["label_agreement"] = sum(a == b for a, b in both) / max(1, len(both))
+            results["listing_quality_small"]["rendition_check"] = small_engine.rendition_check
+
+        # Expire every entry at once so the second pass revalidates all of them.
+        expiring_cache = ImageScoreCache(os.path.join(tmp, "revalidate.sqlite"), ttl_seconds=0)
+        refresh_engine = ListingQualityEvaluator(max_workers=max_workers, cache=expiring_cache,
+                                                 scheduler=DownloadScheduler())
+        refresh_engine.get_scores(df['Image'])
+        sent, not_modified = server.bytes_sent, server.not_modified
+        results["revalidate"] = _measure(lambda: refresh_engine.get_scores(df['Image']))
+        results["revalidate"]["download_mb"] = (server.bytes_sent - sent) / 1e6
+        results["revalidate"]["not_modified"] = server.not_modified - not_modified
+
+        score_engine = PrismScoreEvaluator()
+        results["score_frame"] = _measure(lambda: score_engine.score_frame(df))
+        sample = df.head(min(len(df), 20_000))
+        results["get_score_apply"] = _measure(lambda: sample.apply(score_engine.get_score, axis=1))
+        results["get_score_apply"]["rows"] = len(sample)
+
+        metrics = PipelineMetrics()
+        pipeline_engine = ListingQualityEvaluator(max_workers=max_workers, use_cache=False, scheduler=DownloadScheduler())
+        results["pipeline"] = _measure(lambda: process_csv(csv_path, metrics=metrics, quality_engine=pipeline_engine))
+        results["pipeline"]["stages"] = metrics.to_dict()["stages"]
+        results["pipeline"]["image_errors"] = metrics.to_dict()["errors"]
+        results["listing_quality"]["scheduler"] = quality_engine.scheduler.stats()
+        results["image_server"] = {"requests": server.requests, "failures": server.failures, "throttled": server.throttled,
+                                   "not_modified": server.not_modified, "mb_sent": server.bytes_sent / 1e6}
+
+    for name, result in results.items():
+        rows_measured = result.get("rows", rows)
+        if "seconds" in result and result["seconds"]:
+            result["rows_per_s"] = rows_measured / result["seconds"]
+    return results
+
+# Modules that only image scoring needs; importing the app must not load them.
+HEAVY_MODULES = ("cv2", "requests", "spacy")
+
+_IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import prism_app
+seconds = time.perf_counter() - started
+print(json.dumps({"seconds": seconds, "heavy_modules": [m for m in %r if m in sys.modules]}))
+"""
+
+_RENDER_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_string("import prism_app\\nprism_app.main()", default_timeout=%r)
+started = time.perf_counter()
+app.run()
+seconds = time.perf_counter() - started
+print(json.dumps({"seconds": seconds, "heavy_modules": [m for m in %r if m in sys.modules],
+                  "exceptions": [e.value for e in app.exception]}))
+"""
+
+def _run_probe(code: str, app_dir: str) -> dict:
+    completed = subprocess.run([sys.executable, "-c", code], cwd=app_dir, capture_output=True,
+                               text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def bench_startup(repeat: int = 3, render_timeout: float = 60, app_dir: str = None) -> dict:
+    """
+    Times a cold `import prism_app` and a cold first render, each in a new
+    interpreter, keeping the best of `repeat` runs. Also lists which of
+    `HEAVY_MODULES` were loaded by then.
+    """
+    app_dir = app_dir or os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for name, code in (("import", _IMPORT_PROBE % (HEAVY_MODULES,)),
+                       ("first_render", _RENDER_PROBE % (render_timeout, HEAVY_MODULES))):
+        runs = [_run_probe(code, app_dir) for _ in range(repeat)]
+        results[name] = min(runs, key=lambda run: run["seconds"])
+        results[name]["runs_s"] = [run["seconds"] for run in runs]
+    return results
+
+def _environment() -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PRISM benchmarks.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    identify = subparsers.add_parser("identify", help="ItemIdentifier throughput")
+    identify.add_argument("csv_paths", nargs="*", help="Category CSVs (default: products_*.csv)")
+    identify.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is kept")
+
+    for name, help_text in (("generate", "Write a synthetic category CSV"),
+                            ("suite", "Benchmark every engine and the pipeline on synthetic data")):
+        sub = subparsers.add_parser(name, help=help_text)
+        if name == "generate":
+            sub.add_argument("csv_path", help="Where to write the CSV")
+            sub.add_argument("--image-base-url", default="http://127.0.0.1:8000")
+        size = sub.add_mutually_exclusive_group()
+        size.add_argument("--scale", type=float, default=10, help=f"Multiple of {BASE_ROWS} rows")
+        size.add_argument("--rows", type=int, help="Exact row count")
+        sub.add_argument("--unique-images", type=int, default=0,
+                         help="Number of distinct image URLs (default: one per row)")
+        sub.add_argument("--seed", type=int, default=0)
+    startup = subparsers.add_parser("startup", help="Import and first-render time of prism_app.py")
+    startup.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is kept")
+    startup.add_argument("--import-budget", type=float, default=2.0, help="Seconds allowed for the import")
+    startup.add_argument("--render-budget", type=float, default=6.0, help="Seconds allowed for the first render")
+    startup.add_argument("--output", help="Write the results as JSON to this path")
+    suite = subparsers.choices["suite"]
+    suite.add_argument("--latency-ms", type=float, default=20, help="Image server latency")
+    suite.add_argument("--jitter-ms", type=float, default=10, help="Image server latency jitter")
+    suite.add_argument("--failure-rate", type=float, default=0.01, help="Fraction of image requests that fail")
+    suite.add_argument("--max-workers", type=int, default=16, help="Image download concurrency")
+    suite.add_argument("--capacity", type=int, default=0,
+                       help="Requests the image server handles at once before answering 429 (0: unlimited)")
+    suite.add_argument("--image-size", type=int, default=100,
+                       help="Also measure listing quality at this smaller image rendition (0 to skip)")
+    suite.add_argument("--keep-csv", help="Keep the generated CSV at this path")
+    suite.add_argument("--output", help="Write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    if args.command == "identify":
+        for result in bench_identify(args.csv_paths or sorted(glob.glob("products_*.csv")), args.repeat):
+            print(f"{result['csv']}: {result['titles']} titles | "
+                  f"identify {result['identify_titles_per_s']:,.0f}/s | "
+                  f"identify_many cold {result['identify_many_cold_titles_per_s']:,.0f}/s, "
+                  f"warm {result['identify_many_warm_titles_per_s']:,.0f}/s")
+        return
+
+    if args.command == "startup":
+        results = bench_startup(args.repeat)
+        failures = []
+        for name, budget in (("import", args.import_budget), ("first_render", args.render_budget)):
+            result = results[name]
+            result["budget_s"] = budget
+            print(f"{name:>12}: {result['seconds']:.3f}s (budget {budget:.1f}s)"
+                  f"  heavy modules loaded: {', '.join(result['heavy_modules']) or 'none'}")
+            if result["seconds"] > budget:
+                failures.append(f"{name} took {result['seconds']:.3f}s, over its {budget:.1f}s budget")
+        if results["import"]["heavy_modules"]:
+            failures.append(f"importing the app loaded {', '.join(results['import']['heavy_modules'])}")
+        if results["first_render"].get("exceptions"):
+            failures.append(f"first render raised: {results['first_render']['exceptions']}")
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump({"environment": _environment(), "results": results}, f, indent=2)
+            print(f"Results written to {args.output}")
+        if failures:
+            raise SystemExit("Startup check failed: " + "; ".join(failures))
+        return
+
+    rows = args.rows or int(BASE_ROWS * args.scale)
+    if args.command == "generate":
+        generate_products_csv(args.csv_path, rows, args.image_base_url,
+                              unique_images=args.unique_images, seed=args.seed)
+        print(f"Wrote {rows:,} rows to {args.csv_path}")
+        return
+
+    results = run_suite(rows, args.latency_ms, args.jitter_ms, args.failure_rate,
+                        args.unique_images, args.max_workers, args.seed, args.keep_csv, args.image_size, args.capacity)
+    for name, result in results.items():
+        if "seconds" in result:
+            print(f"{name:>21}: {result['seconds']:8.3f}s  {result.get('rows_per_s', 0):>12,.0f} rows/s"
+                  f"  peak RSS {result['peak_rss_mb']:8.1f} MB (+{result['rss_growth_mb']:.1f})"
+                  + (f"  {result['download_mb']:.1f} MB downloaded" if "download_mb" in result else ""))
+    if args.output:
+        report = {
+            "environment": _environment(),
+            "parameters": {key: value for key, value in vars(args).items() if key != "command"} | {"rows": rows},
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# File: compact_frame.py
+"""
+Compact in-memory layout for processed product frames.
+
+    python compact_frame.py products_electronics.csv   # memory report per column
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Low-cardinality text columns stored as categoricals.
+CATEGORICAL_COLUMNS = ['Potential', 'Listing Quality', 'Identified Item', 'Monthly Sales']
+# Raw text columns that can be rebuilt from their parsed form when displayed.
+DERIVED_COLUMNS = {'Ratings': 'Ratings_Num'}
+
+def _downcast(series: pd.Series) -> pd.Series:
+    """
+    Narrows a numeric column only when no value changes, so scoring a compact
+    frame gives the same results as the full one.
+    """
+    if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+        return series
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+    values = series.to_numpy()
+    if not np.isnan(values).any() and np.array_equal(values, np.round(values)) \
+            and np.abs(values).max(initial=0) < 2**31:
+        return pd.to_numeric(series, downcast='integer')
+    narrowed = series.astype(np.float32)
+    if np.array_equal(narrowed.to_numpy(dtype=np.float64), values, equal_nan=True):
+        return narrowed
+    return series
+
+def compact_products(df: pd.DataFrame, max_category_ratio: float = 0.5, keep=()) -> pd.DataFrame:
+    """
+    Returns a smaller copy of a processed frame: derivable raw text columns
+    dropped, label columns as categoricals (when fewer than `max_category_ratio`
+    of their values are distinct), other text as Arrow strings, and numbers
+    narrowed losslessly. Columns in `keep` are left as they are, e.g. because
+    they are still being filled in.
+    """
+    compact = df.drop(columns=[column for column, source in DERIVED_COLUMNS.items()
+                               if column in df and source in df])
+    for column in compact.columns:
+        if column in keep:
+            continue
+        series = compact[column]
+        if column in CATEGORICAL_COLUMNS and len(series) \
+                and series.nunique(dropna=True) / len(series) < max_category_ratio:
+            compact[column] = series.astype('category')
+        elif series.dtype == object:
+            # Arrow-backed strings avoid one Python object per value.
+            compact[column] = series.astype('string[pyarrow]')
+        else:
+            compact[column] = _downcast(series)
+    return compact
+
+def report_details(report: pd.DataFrame) -> dict:
+    """
+    A `memory_report` as a JSON-serializable dict, for `PipelineMetrics.record_detail`.
+    """
+    return report.astype(object).where(report.notna(), None).to_dict("index")
+
+def rating_text(product: pd.Series):
+    """
+    The raw 'Ratings' text of a product row, rebuilt from 'Ratings_Num' in a compact frame.
+    """
+    if 'Ratings' in product:
+        return product['Ratings']
+    rating = product.get('Ratings_Num')
+    return f"{rating:.1f} out of 5 stars" if pd.notna(rating) else None
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bytes and dtype per column before and after compaction, with a total row.
+    """
+    before_bytes = before.memory_usage(index=False, deep=True)
+    after_bytes = after.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'bytes_before': before_bytes,
+        'dtype_after': after.dtypes.reindex(before.columns).astype(str).replace('nan', 'derived'),
+        'bytes_after': after_bytes.reindex(before.columns).fillna(0).astype(int),
+    })
+    report.loc['Total'] = ['', before_bytes.sum(), '', after_bytes.sum()]
+    report['saved_pct'] = (1 - report['bytes_after'] / report['bytes_before'].where(report['bytes_before'] > 0)) * 100
+    return report
+
+def main(argv=None):
+    from data_pipeline import process_csv
+    from precompute import load_artifact
+
+    parser = argparse.ArgumentParser(description="Report per-column memory of the compact layout.")
+    parser.add_argument("csv_paths", nargs="+", help="Category CSVs (their artifacts are used when current)")
+    args = parser.parse_args(argv)
+    for csv_path in args.csv_paths:
+        df = load_artifact(csv_path)
+        if df is None:
+            df = process_csv(csv_path)
+        if df is None:
+            print(f"{csv_path}: not found")
+            continue
+        print(f"\n{csv_path}")
+        print(memory_report(df, compact_products(df)).to_string(float_format="{:.1f}".format))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# File: data_pipeline.py
+import pandas as pd
+
+from item_identifier import ItemIdentifier
+from listing_quality_evaluator import ListingQualityEvaluator
+from pipeline_metrics import PipelineMetrics
+from prism_score_evaluator import PrismScoreEvaluator
+
+def clean_products(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parses the raw scraped text columns into the numeric columns the engines use.
+    """
+    df['Price'] = pd.to_numeric(df['Price'].astype(str).str.replace(',', ''), errors='coerce')
+    df['Review'] = pd.to_numeric(df['Review'].astype(str).str.replace(',', ''), errors='coerce')
+    df['Ratings_Num'] = df['Ratings'].str.extract(r'(\d\.\d)').astype(float)
+    df['Cleaned Sales'] = df['Monthly Sales'].str.lower().str.replace('k', '000').str.extract(r'(\d+)').astype(float).fillna(0).astype(int)
+    return df
+
+# The raw scraped fields a processed row is derived from.
+INPUT_COLUMNS = ['Image', 'Title', 'Price', 'Ratings', 'Review', 'Monthly Sales']
+# The expensive per-row results that can be carried over from a previous run.
+REUSABLE_COLUMNS = ['Identified Item', 'Listing Quality']
+
+def row_fingerprints(df: pd.DataFrame) -> pd.Series:
+    """
+    A 64-bit hash of each row's raw input fields, stable across runs and files.
+    The fields must be read as text (see `TEXT_COLUMNS`), and hashed before
+    `clean_products` rewrites Price and Review.
+    """
+    return pd.util.hash_pandas_object(df[INPUT_COLUMNS].astype(str), index=False)
+
+def _reuse_previous(df: pd.DataFrame, previous: pd.DataFrame) -> pd.Series:
+    """
+    Copies the reusable columns from `previous` into rows of `df` with a
+    matching 'Row Fingerprint' and returns the mask of rows that still need
+    computing. Rows whose image previously failed are computed again.
+
+    `previous` is a frame, or a function that takes an array of fingerprints
+    and returns the previous rows among them.
+    """
+    if callable(previous):
+        previous = previous(df['Row Fingerprint'].to_numpy())
+    if previous is None or 'Row Fingerprint' not in previous \
+            or not set(REUSABLE_COLUMNS) <= set(previous.columns):
+        return pd.Series(True, index=df.index)
+    previous = previous[['Row Fingerprint'] + REUSABLE_COLUMNS]
+    previous = previous[previous['Listing Quality'].astype(object) != "Error"]
+    lookup = previous.drop_duplicates('Row Fingerprint').set_index('Row Fingerprint')
+    reused = df['Row Fingerprint'].isin(lookup.index)
+    matches = lookup.loc[df.loc[reused, 'Row Fingerprint']]
+    for column in REUSABLE_COLUMNS:
+        df[column] = pd.Series(None, index=df.index, dtype=object)
+        df.loc[reused, column] = matches[column].astype(object).to_numpy()
+    return ~reused
+
+def process_products(df: pd.DataFrame, item_engine: ItemIdentifier = None,
+                     quality_engine: ListingQualityEvaluator = None,
+                     score_engine: PrismScoreEvaluator = None,
+                     metrics: PipelineMetrics = None,
+                     previous: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Cleans a raw product frame and runs all three engines over it, timing each
+    stage in `metrics` if given.
+
+    Every row gets a 'Row Fingerprint'. When the processed frame of an earlier
+    run is passed as `previous`, rows whose fingerprint it already has keep
+    their identified item and listing quality instead of being recomputed; the
+    counts land in the "rows_reused" and "rows_recomputed" counters. Scores are
+    always recomputed, since they are cheap and depend on the scoring rules.
+    """
+    item_engine = item_engine or ItemIdentifier()
+    quality_engine = quality_engine or ListingQualityEvaluator()
+    score_engine = score_engine or PrismScoreEvaluator()
+    metrics = metrics or PipelineMetrics()
+    with metrics.stage("fingerprint", rows=len(df)):
+        df['Row Fingerprint'] = row_fingerprints(df)
+    with metrics.stage("clean", rows=len(df)):
+        clean_products(df)
+    with metrics.stage("reuse", rows=len(df)):
+        todo = _reuse_previous(df, previous)
+    metrics.count("rows_reused", int((~todo).sum()))
+    metrics.count("rows_recomputed", int(todo.sum()))
+    if todo.all():
+        with metrics.stage("identify", rows=len(df)):
+            df['Identified Item'] = item_engine.identify_many(df['Title'])
+        with metrics.stage("listing_quality", rows=len(df)):
+            df['Listing Quality'] = quality_engine.get_scores(df['Image'], metrics=metrics)
+    elif todo.any():
+        with metrics.stage("identify", rows=int(todo.sum())):
+            df.loc[todo, 'Identified Item'] = item_engine.identify_many(df.loc[todo, 'Title'])
+        with metrics.stage("listing_quality", rows=int(todo.sum())):
+            df.loc[todo, 'Listing Quality'] = quality_engine.get_scores(df.loc[todo, 'Image'], metrics=metrics)
+    with metrics.stage("score", rows=len(df)):
+        df[['PRISM Score', 'Potential', 'Missing Data']] = score_engine.score_frame(df)
+    return df
+
+# Every input field is read as text, so a row's fingerprint does not depend on
+# the dtype pandas would infer for the file or chunk it came in, and the `.str`
+# cleaning in `clean_products` applies even to a chunk with no values.
+TEXT_COLUMNS = dict.fromkeys(INPUT_COLUMNS, str)
+
+def read_products(csv_path: str, chunk_rows: int = None):
+    """
+    Reads a category CSV, or returns an iterator of frames of at most
+    `chunk_rows` rows when it is given.
+    """
+    return pd.read_csv(csv_path, dtype=TEXT_COLUMNS, chunksize=chunk_rows)
+
+def process_csv(csv_path: str, metrics: PipelineMetrics = None, **engines) -> pd.DataFrame:
+    """
+    Reads and fully processes one category CSV. Returns None if the file is missing.
+    `engines` (and `previous`) are passed on to `process_products`.
+    """
+    metrics = metrics or PipelineMetrics()
+    try:
+        with metrics.stage("read_csv") as stage:
+            df = read_products(csv_path)
+            stage["rows"] = len(df)
+    except FileNotFoundError: return None
+    return process_products(df, metrics=metrics, **engines)
+
+def iter_processed_chunks(csv_path: str, chunk_rows: int = 50_000, metrics: PipelineMetrics = None,
+                          **engines):
+    """
+    Streams a category CSV through cleaning, identification and scoring
+    `chunk_rows` rows at a time, yielding each processed chunk. Only one chunk
+    is held at once, so memory is bounded by the chunk size, not the file size.
+    The engines are shared across chunks so their caches carry over, and
+    `previous` is matched against every chunk; pass a lookup function (see
+    `_reuse_previous`) to keep previous results out of memory as well.
+    """
+    engines.setdefault('item_engine', ItemIdentifier())
+    engines.setdefault('quality_engine', ListingQualityEvaluator())
+    engines.setdefault('score_engine', PrismScoreEvaluator())
+    metrics = metrics or PipelineMetrics()
+    reader = read_products(csv_path, chunk_rows=chunk_rows)
+    while True:
+        with metrics.stage("read_csv") as stage:
+            chunk = next(reader, None)
+            stage["rows"] = len(chunk) if chunk is not None else 0
+        if chunk is None:
+            return
+        yield process_products(chunk, metrics=metrics, **engines)
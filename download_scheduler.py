@@ -0,0 +1,298 @@
+# File: download_scheduler.py
+import email.utils
+import random
+import threading
+import time
+import urllib.parse
+
+# Responses worth retrying: throttling and server-side failures.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request to a host whose circuit breaker stays
+    open for longer than the request is willing to wait.
+    """
+
+class HostBusyError(Exception):
+    """
+    Raised when a request would wait longer than it is willing to for one of
+    its host's concurrency slots.
+    """
+
+class AdaptiveLimit:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit for one host.
+
+    Outcomes are judged in rounds of at least `round_size` responses (or the
+    current limit, if larger). A round with more than `error_threshold` of its
+    requests failed, or with the smoothed latency above `latency_target_s`,
+    multiplies the limit by `decrease_factor`; any other round raises it by
+    one. Judging whole rounds keeps a low background error rate from
+    throttling a healthy host.
+
+    Foreground requests (see `acquire`) never wait for a slot: they run past
+    the limit, so a user is not queued behind background batches.
+    """
+    def __init__(self, initial: int = 8, minimum: int = 1, maximum: int = 32, latency_target_s: float = 2.0,
+                 error_threshold: float = 0.1, decrease_factor: float = 0.5, round_size: int = 20):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target_s = latency_target_s
+        self.error_threshold = error_threshold
+        self.decrease_factor = decrease_factor
+        self.round_size = round_size
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self.latency_s = None
+        self.decreases = 0
+        self._round_done = 0
+        self._round_failed = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float = None, foreground: bool = False) -> bool:
+        """
+        Takes a slot, waiting up to `timeout` seconds (or forever) for one to
+        free up, and returns False if none did. Foreground requests take one
+        at once, even past the limit.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while not foreground and self.in_flight >= int(self.limit):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    # Pass on a wake-up this waiter may have taken.
+                    self._condition.notify()
+                    return False
+                self._condition.wait(remaining)
+            self.in_flight += 1
+        return True
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def record(self, latency_s: float, failed: bool):
+        with self._condition:
+            if not failed:
+                self.latency_s = latency_s if self.latency_s is None else 0.8 * self.latency_s + 0.2 * latency_s
+            self._round_done += 1
+            self._round_failed += failed
+            if self._round_done < max(self.round_size, int(self.limit)):
+                return
+            if self._round_failed / self._round_done > self.error_threshold \
+                    or (self.latency_s or 0) > self.latency_target_s:
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                self.decreases += 1
+            else:
+                self.limit = min(self.maximum, self.limit + 1)
+                self._condition.notify_all()
+            self._round_done = self._round_failed = 0
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a host after `failure_threshold` transient
+    failures in a row. After `reset_timeout_s` a single probe request is let
+    through; its success closes the circuit again, its failure re-opens it.
+    """
+    def __init__(self, failure_threshold: int = 10, reset_timeout_s: float = 5.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def wait_time(self) -> float:
+        """
+        Returns 0 if a request may be sent now, otherwise how long to wait
+        before asking again. Returning 0 in the half-open state claims the probe.
+        """
+        with self._lock:
+            if self.state == "open":
+                remaining = self._opened_at + self.reset_timeout_s - time.monotonic()
+                if remaining > 0:
+                    return remaining
+                self.state, self._probing = "half_open", False
+            if self.state == "half_open":
+                if self._probing:
+                    return min(0.1, self.reset_timeout_s)
+                self._probing = True
+            return 0.0
+
+    def release_probe(self):
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.state, self.failures, self._probing = "closed", 0, False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state, self._opened_at, self._probing = "open", time.monotonic(), False
+                self.opened += 1
+
+def _retry_after(response) -> float:
+    """
+    Seconds from a Retry-After header (delta-seconds or HTTP date), or None.
+    """
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class DownloadScheduler:
+    """
+    Sends GET requests through a per-host `AdaptiveLimit` and `CircuitBreaker`.
+    Timeouts, connection errors and `RETRY_STATUSES` responses are retried up
+    to `max_attempts` times. Each retry waits for the server's Retry-After if
+    it sent one, otherwise for a random time up to an exponentially growing
+    cap (full jitter). No request waits more than `max_wait_s` in total for a
+    concurrency slot, backoff or an open circuit. Interactive callers pass
+    `foreground=True` to `get`: they skip the concurrency limit, and a failure
+    or an open circuit is reported at once rather than waited out.
+    """
+    def __init__(self, max_attempts: int = 4, base_backoff_s: float = 0.1, max_backoff_s: float = 10.0,
+                 max_wait_s: float = 30.0, initial_limit: int = 8, max_limit: int = 32,
+                 latency_target_s: float = 2.0, failure_threshold: int = 10, reset_timeout_s: float = 5.0):
+        self.max_attempts = max_attempts
+        self.base_backoff_s = base_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.max_wait_s = max_wait_s
+        self.initial_limit = initial_limit
+        self.max_limit = max_limit
+        self.latency_target_s = latency_target_s
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def host(self, url: str) -> tuple:
+        """
+        The `(AdaptiveLimit, CircuitBreaker)` pair for the host of `url`.
+        """
+        host = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (
+                    AdaptiveLimit(self.initial_limit, maximum=self.max_limit, latency_target_s=self.latency_target_s),
+                    CircuitBreaker(self.failure_threshold, self.reset_timeout_s),
+                )
+            return self._hosts[host]
+
+    def get(self, session, url: str, metrics=None, max_wait_s: float = None, foreground: bool = False,
+            **kwargs):
+        """
+        Returns the response of `session.get(url, **kwargs)`. If every attempt
+        fails, returns the last retryable response, or raises the last error.
+        `max_wait_s` overrides the scheduler's limit on time spent waiting; it
+        defaults to 0 for `foreground` requests.
+        """
+        import requests
+
+        if max_wait_s is None:
+            max_wait_s = 0.0 if foreground else self.max_wait_s
+        limit, breaker = self.host(url)
+        waited = 0.0
+        attempt = 0
+        while True:
+            wait = breaker.wait_time()
+            if wait:
+                if waited + wait > max_wait_s:
+                    raise CircuitOpenError(f"Circuit open for {urllib.parse.urlsplit(url).netloc}")
+                time.sleep(wait)
+                waited += wait
+                continue
+
+            response, error = None, None
+            queued = time.monotonic()
+            if not limit.acquire(max(0.0, max_wait_s - waited), foreground):
+                breaker.release_probe()
+                raise HostBusyError(f"No free slot for {urllib.parse.urlsplit(url).netloc}")
+            waited += time.monotonic() - queued
+            started = time.perf_counter()
+            try:
+                response = session.get(url, **kwargs)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                error = e
+            except Exception:
+                # Not the host's fault (e.g. an invalid URL); let another request probe it.
+                breaker.release_probe()
+                raise
+            finally:
+                limit.release()
+            failed = error is not None or response.status_code in RETRY_STATUSES
+            limit.record(time.perf_counter() - started, failed)
+            if not failed:
+                breaker.record_success()
+                return response
+
+            breaker.record_failure()
+            attempt += 1
+            delay = _retry_after(response)
+            if delay is None:
+                delay = self._random.uniform(0, min(self.max_backoff_s, self.base_backoff_s * 2 ** attempt))
+            give_up = attempt >= self.max_attempts or waited + delay > max_wait_s
+            if metrics:
+                metrics.count("download_gave_up" if give_up else "download_retries")
+                if response is not None and response.status_code == 429:
+                    metrics.count("throttled")
+            if give_up:
+                if error is not None:
+                    raise error
+                return response
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+            waited += delay
+
+    def stats(self) -> dict:
+        with self._lock:
+            hosts = dict(self._hosts)
+        return {
+            host: {
+                "limit": round(limit.limit, 2),
+                "in_flight": limit.in_flight,
+                "limit_decreases": limit.decreases,
+                "latency_ms": round(limit.latency_s * 1000, 1) if limit.latency_s is not None else None,
+                "circuit": breaker.state,
+                "circuit_opened": breaker.opened,
+            }
+            for host, (limit, breaker) in hosts.items()
+        }
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def shared_scheduler() -> DownloadScheduler:
+    """
+    The process-wide scheduler. Evaluators use it unless given their own, so
+    every category load, warm-up worker and precompute run in a process
+    shares each host's concurrency limit and circuit breaker.
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = DownloadScheduler()
+        return _shared
@@ -0,0 +1,146 @@
+# File: frame_store.py
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pandas as pd
+
+def frame_nbytes(df) -> int:
+    if isinstance(df, pd.DataFrame):
+        return int(df.memory_usage(index=True, deep=True).sum())
+    # Objects wrapping a frame, such as a ProgressiveCategory, report their own size.
+    return int(df.nbytes)
+
+class FrameStore:
+    """
+    Process-wide store of processed category frames, shared by every session
+    and rerun without copying.
+
+    Frames are handed out as-is, so callers must treat them as read-only. The
+    store keeps the total size of its frames under `budget_bytes` by evicting
+    the least recently used category; a single frame larger than the budget is
+    still kept until another category is loaded. Besides DataFrames, the store
+    holds objects with an `nbytes` size, and calls `close()` on them when they
+    are evicted, if they have one. Sizes are taken when an entry is stored.
+    An entry derived from another one, such as a category's scores, names it
+    as its `parent` and is dropped along with it.
+    Concurrent requests for a
+    category that is still loading wait for that load instead of starting
+    another one, which also lets `prefetch` warm categories in the background.
+    """
+    def __init__(self, budget_bytes: int = 1 << 30):
+        self.budget_bytes = budget_bytes
+        self._frames = OrderedDict()
+        self._sizes = {}
+        self._loading = {}
+        self._errors = {}
+        self._parents = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, loader, parent: str = None):
+        """
+        Returns the frame stored under `key`, calling `loader(key)` to build it
+        the first time. A loader result of None is passed through, not stored.
+        With `parent`, the entry is evicted whenever the `parent` entry is, and
+        is not stored if `parent` was evicted while it was being built.
+        """
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                return self._frames[key]
+            future = self._loading.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = self._loading[key] = Future()
+
+        if not is_owner:
+            return future.result()
+
+        try:
+            df = loader(key)
+        except BaseException as error:
+            with self._lock:
+                del self._loading[key]
+                self._errors[key] = error
+            future.set_exception(error)
+            raise
+        with self._lock:
+            del self._loading[key]
+            if df is not None:
+                self._errors.pop(key, None)
+                if parent is None or parent in self._frames:
+                    self._store(key, df, parent)
+            else:
+                self._errors[key] = LookupError(f"Nothing was loaded for {key!r}")
+        future.set_result(df)
+        return df
+
+    def prefetch(self, keys, loader, max_workers: int = None) -> dict:
+        """
+        Starts loading `keys` in background threads and returns `{key: Future}`.
+        A later `get` for a key that is still loading waits for the same load.
+        """
+        keys = list(dict.fromkeys(keys))
+        executor = ThreadPoolExecutor(max_workers=max_workers or max(1, len(keys)),
+                                      thread_name_prefix="frame-store-prefetch")
+        futures = {key: executor.submit(self.get, key, loader) for key in keys}
+        executor.shutdown(wait=False)
+        return futures
+
+    def status(self, key: str) -> str:
+        """
+        One of "ready", "loading", "failed" or "idle" (never loaded, or evicted).
+        """
+        with self._lock:
+            if key in self._frames:
+                return "ready"
+            if key in self._loading:
+                return "loading"
+            if key in self._errors:
+                return "failed"
+            return "idle"
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._frames
+
+    def is_loading(self, key: str) -> bool:
+        with self._lock:
+            return key in self._loading
+
+    def evict(self, key: str):
+        with self._lock:
+            if key in self._frames:
+                self._discard(key)
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "used_bytes": sum(self._sizes.values()),
+                "frames": {key: self._sizes[key] for key in self._frames},
+                "loading": list(self._loading),
+            }
+
+    def _store(self, key: str, df: pd.DataFrame, parent: str = None):
+        self._frames[key] = df
+        self._sizes[key] = frame_nbytes(df)
+        if parent is not None:
+            self._parents[key] = parent
+        self._frames.move_to_end(key)
+        while sum(self._sizes.values()) > self.budget_bytes and len(self._frames) > 1:
+            self._discard(next(iter(self._frames)))
+
+    def _discard(self, key: str):
+        frame = self._frames.pop(key)
+        del self._sizes[key]
+        self._parents.pop(key, None)
+        if hasattr(frame, "close"):
+            frame.close()
+        for child in [child for child, parent in self._parents.items() if parent == key]:
+            self._discard(child)
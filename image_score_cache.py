@@ -0,0 +1,161 @@
+# File: image_score_cache.py
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(".prism_cache", "listing_quality.sqlite")
+
+class ImageScoreCache:
+    """
+    Persistent, SQLite-backed store of listing-quality results keyed by image URL.
+    Entries older than `ttl_seconds` count as misses, and the least recently
+    used entries are evicted once the store holds more than `max_entries`.
+    Each entry can also keep the ETag and Last-Modified of the image it was
+    measured from, so an expired entry can be revalidated with a conditional
+    request instead of downloaded again (`get_stale`).
+    """
+    # Columns added after the first release; older databases are migrated on open.
+    _MIGRATIONS = {"etag": "TEXT", "last_modified": "TEXT"}
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = 7 * 24 * 3600,
+                 max_entries: int = 200_000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS listing_quality ("
+                " url TEXT PRIMARY KEY,"
+                " coverage REAL NOT NULL,"
+                " label TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS listing_quality_accessed ON listing_quality (accessed_at)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(listing_quality)")}
+            for column, column_type in self._MIGRATIONS.items():
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE listing_quality ADD COLUMN {column} {column_type}")
+
+    def get(self, url: str):
+        """
+        Returns `(coverage_percentage, label)` for a fresh entry, otherwise None.
+        """
+        return self.get_many([url]).get(url)
+
+    def get_many(self, urls) -> dict:
+        """
+        Looks up many URLs at once and returns `{url: (coverage_percentage, label)}`
+        for the fresh entries only.
+        """
+        urls = list(dict.fromkeys(urls))
+        now = time.time()
+        found = {}
+        with self._lock, self._conn:
+            for start in range(0, len(urls), 500):
+                batch = urls[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT url, coverage, label FROM listing_quality"
+                    f" WHERE url IN ({placeholders}) AND created_at >= ?",
+                    (*batch, now - self.ttl_seconds),
+                ).fetchall()
+                found.update({url: (coverage, label) for url, coverage, label in rows})
+            if found:
+                self._conn.executemany(
+                    "UPDATE listing_quality SET accessed_at = ? WHERE url = ?",
+                    [(now, url) for url in found],
+                )
+            self.hits += len(found)
+            self.misses += len(urls) - len(found)
+        return found
+
+    def get_stale(self, urls) -> dict:
+        """
+        Returns `{url: (coverage_percentage, label, etag, last_modified)}` for
+        expired entries that have an ETag or Last-Modified to revalidate with.
+        """
+        urls = list(dict.fromkeys(urls))
+        found = {}
+        with self._lock:
+            for start in range(0, len(urls), 500):
+                batch = urls[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT url, coverage, label, etag, last_modified FROM listing_quality"
+                    f" WHERE url IN ({placeholders}) AND created_at < ?"
+                    f" AND (etag IS NOT NULL OR last_modified IS NOT NULL)",
+                    (*batch, time.time() - self.ttl_seconds),
+                ).fetchall()
+                found.update({url: tuple(rest) for url, *rest in rows})
+        return found
+
+    def put(self, url: str, coverage: float, label: str, etag: str = None, last_modified: str = None):
+        self.put_many([(url, coverage, label, etag, last_modified)])
+
+    def put_many(self, entries):
+        """
+        Stores `(url, coverage_percentage, label)` tuples, optionally followed by
+        the image's `etag` and `last_modified`, then evicts the least recently
+        used entries if the store has grown past `max_entries`.
+        """
+        now = time.time()
+        rows = []
+        for url, coverage, label, *validators in entries:
+            etag, last_modified = (list(validators) + [None, None])[:2]
+            rows.append((url, float(coverage), label, now, now, etag, last_modified))
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO listing_quality"
+                " (url, coverage, label, created_at, accessed_at, etag, last_modified)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            excess = self._count() - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM listing_quality WHERE url IN ("
+                    " SELECT url FROM listing_quality ORDER BY accessed_at LIMIT ?)",
+                    (excess,),
+                )
+
+    def purge_expired(self) -> int:
+        """
+        Deletes entries older than the TTL and returns how many were removed.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM listing_quality WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM listing_quality")
+        self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._count()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM listing_quality").fetchone()[0]
@@ -1,12 +1,13 @@
 # File: item_identifier.py
 import re
+from functools import lru_cache
 
 class ItemIdentifier:
     """
     Identifies the core item from a product title using the "Top 10 Words"
     rule-based logic. No external NLP libraries are needed.
     """
-    def __init__(self):
+    def __init__(self, cache_size: int = 50_000):
         self._noise_words = {
             'stylish', 'comfortable', 'premium', 'high', 'quality', 'heavy', 'duty',
             'waterproof', 'convertible', 'streachable', 'full', 'loose', 'relaxed',
@@ -23,6 +24,10 @@ class ItemIdentifier:
             'fitness', 'toning', 'band', 'bands', 'cover', 'support'
         }
         self._model_number_pattern = re.compile(r'\b[a-zA-Z]+\d+[a-zA-Z0-9]*\b|\b\d+[a-zA-Z]+\b')
+        # Same as the per-word punctuation clean-up in `identify`, but leaves the
+        # separating spaces alone so a whole golden zone is cleaned in one call.
+        self._zone_punctuation_pattern = re.compile(r'[^\w\s-]')
+        self._identify_zone = lru_cache(maxsize=cache_size)(self._identify_zone_uncached)
 
     def identify(self, title: str) -> str:
         """
@@ -51,3 +56,31 @@ class ItemIdentifier:
 
         # 3. Join the remaining words
         return " ".join(item_words).title()
+
+    def identify_many(self, titles) -> list:
+        """
+        Identifies many titles at once. Gives the same output as `identify`, but
+        memoizes on the golden zone so repeated titles and prefixes are only
+        processed once.
+        """
+        identify_zone = self._identify_zone
+        return [
+            identify_zone(" ".join(title.lower().split()[:10])) if isinstance(title, str) else "Not Found"
+            for title in titles
+        ]
+
+    def _identify_zone_uncached(self, golden_zone: str) -> str:
+        if not golden_zone:
+            return "Not Found"
+        cleaned_words = self._zone_punctuation_pattern.sub('', golden_zone).split(' ')
+        candidate_words = cleaned_words[1:] if len(cleaned_words) > 1 else cleaned_words
+        search_model_number = self._model_number_pattern.search
+        noise_words = self._noise_words
+        item_words = [
+            word for word in candidate_words
+            if word not in noise_words and not search_model_number(word)
+        ]
+
+        if not item_words:
+            return "Not Found"
+        return " ".join(item_words).title()
@@ -1,13 +1,106 @@
 # File: listing_quality_evaluator.py
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
-import requests
-import cv2
-import numpy as np
+
+from coverage_analyzer import CoverageAnalyzer
+from download_scheduler import CircuitOpenError, DownloadScheduler, HostBusyError, shared_scheduler
+from image_score_cache import ImageScoreCache
+from pipeline_metrics import PipelineMetrics
+
+# `requests` is imported where it is used, so only scoring images pays for it.
+
+# The size token in Amazon CDN image URLs, e.g. "._AC_UL320_" or "._AC_UY218_".
+_SIZE_TOKEN = re.compile(r'(\._AC_(?:UL|UY|UX|SL|SX|SY))(\d+)(_)')
+# Returned in place of a coverage when a conditional request finds the image unchanged.
+NOT_MODIFIED = "not_modified"
+
+def rendition_url(image_url: str, size: int) -> str:
+    """
+    Rewrites the CDN size token so the URL asks for a rendition at most `size`
+    pixels on its long side. URLs without a token, or already smaller, are unchanged.
+    """
+    def shrink(match):
+        return f"{match.group(1)}{min(size, int(match.group(2)))}{match.group(3)}"
+    return _SIZE_TOKEN.sub(shrink, image_url)
+
+def _error_type(error: Exception) -> str:
+    import requests
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(error, HostBusyError):
+        return "host_busy"
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return f"http_{error.response.status_code}"
+    if isinstance(error, requests.Timeout):
+        return "timeout"
+    if isinstance(error, requests.ConnectionError):
+        return "connection_error"
+    if isinstance(error, (requests.exceptions.InvalidURL, requests.exceptions.MissingSchema,
+                          requests.exceptions.InvalidSchema)):
+        return "invalid_url"
+    if isinstance(error, requests.RequestException):
+        return type(error).__name__
+    if isinstance(error, ValueError):
+        return "decode_error"
+    return type(error).__name__
 
 class ListingQualityEvaluator:
     """
     Analyzes a product image to determine the area covered by the main object.
+
+    Single images go through `get_score`; whole columns should go through
+    `get_scores`, which downloads concurrently over a pooled keep-alive session.
+    Every download goes through a `DownloadScheduler`, by default the
+    process-wide `shared_scheduler()`, so all evaluators share one limit per
+    host. It adapts each host's concurrency, retries throttled and failed
+    requests, and stops hitting a host that keeps failing, so transient CDN
+    trouble does not turn into "Error" ratings.
+    Results are kept in a persistent `ImageScoreCache` unless `use_cache` is off.
+    Decoding and thresholding is done by a `CoverageAnalyzer`; if it has a
+    process pool, downloaded images are handed to it `batch_size` at a time.
+
+    Pass `foreground=True` for fetches a user is waiting on: they never wait
+    for a concurrency slot, backoff or an open circuit, and report a failure
+    as "Error" at once.
+
+    With `rendition_size` set (e.g. 100), `get_scores` downloads that smaller
+    CDN rendition instead of the full one. Before switching, background calls
+    rate up to `rendition_sample` images at both sizes, adding to the sample
+    across calls. Once at least `min_rendition_pairs` images have been rated
+    both ways, it keeps the small rendition only if at least
+    `min_rendition_agreement` of the labels agree, and stores the outcome in
+    `rendition_check`. Expired cache entries are
+    refreshed with conditional requests, so unchanged images are not
+    downloaded again.
     """
+    _headers = {'User-Agent': 'Mozilla/5.0'}
+
+    def __init__(self, max_workers: int = 16, timeout: float = 10,
+                 cache: ImageScoreCache = None, use_cache: bool = True,
+                 analyzer: CoverageAnalyzer = None, batch_size: int = 256,
+                 rendition_size: int = None, rendition_sample: int = 32, min_rendition_pairs: int = 16,
+                 min_rendition_agreement: float = 0.95, scheduler: DownloadScheduler = None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = (cache or ImageScoreCache()) if use_cache else None
+        self.analyzer = analyzer or CoverageAnalyzer()
+        self.batch_size = batch_size
+        self.rendition_size = rendition_size
+        self.rendition_sample = rendition_sample
+        self.min_rendition_pairs = min_rendition_pairs
+        self.min_rendition_agreement = min_rendition_agreement
+        self.rendition_check = None
+        self._rendition_pairs = []
+        self._rendition_lock = threading.Lock()
+        self.scheduler = scheduler or shared_scheduler()
+        self._session = None
+        self._session_lock = threading.Lock()
+
     @st.cache_data
     def get_score(_self, image_url: str) -> str:
         """
@@ -16,36 +109,222 @@ class ListingQualityEvaluator:
         if not isinstance(image_url, str) or not image_url:
             return "Error"
 
+        cached = _self.cache.get(image_url) if _self.cache else None
+        if cached:
+            return cached[1]
+
         try:
             # 1. Download the image
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(image_url, timeout=10, headers=headers)
+            response = _self.scheduler.get(_self._get_session(), _self._fetch_url(image_url),
+                                           foreground=True, timeout=_self.timeout)
             response.raise_for_status()
-            
-            # 2. Load image with OpenCV
-            image_array = np.frombuffer(response.content, np.uint8)
-            img = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-            
-            # Convert to grayscale for easier processing
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            
-            # 3. Isolate the object from the white background
-            # This creates a binary mask: black for background, white for the object
-            _, thresh = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY_INV)
-            
-            # 4. Calculate the area
-            object_pixels = cv2.countNonZero(thresh)
-            total_pixels = img.shape[0] * img.shape[1]
-            coverage_percentage = (object_pixels / total_pixels) * 100
-            
-            # 5. Assign score based on your logic
-            if coverage_percentage > 70:
-                return "Good"
-            elif coverage_percentage >= 50:
-                return "Average"
-            else:
-                return "Poor"
+            coverage_percentage = _self.analyzer.coverage(response.content)
 
         except Exception:
             # If any step fails, return an error status
             return "Error"
+
+        label = _self._label(coverage_percentage)
+        if _self.cache:
+            _self.cache.put(image_url, coverage_percentage, label)
+        return label
+
+    def get_scores(self, image_urls, metrics: PipelineMetrics = None, foreground: bool = False) -> list:
+        """
+        Rates many image URLs at once and returns the ratings in input order.
+        Repeated URLs are only downloaded once, and cached URLs not at all;
+        expired ones are revalidated with a conditional request when possible.
+        Download sizes, latencies and failures are recorded in `metrics` if given.
+        """
+        image_urls = list(image_urls)
+        unique_urls = list(dict.fromkeys(u for u in image_urls if isinstance(u, str) and u))
+        cached = self.cache.get_many(unique_urls) if self.cache else {}
+        ratings = {url: label for url, (_, label) in cached.items()}
+        pending = [url for url in unique_urls if url not in cached]
+        stale = self.cache.get_stale(pending) if self.cache and pending else {}
+        if metrics:
+            metrics.count("images_requested", len(image_urls))
+            metrics.count("images_unique", len(unique_urls))
+            metrics.count("cache_hits", len(cached))
+            metrics.count("cache_misses", len(pending))
+            metrics.count("images_done", len(cached))
+            invalid = sum(1 for url in image_urls if not (isinstance(url, str) and url))
+            for _ in range(invalid):
+                metrics.record_error("invalid_url")
+
+        if pending:
+            workers = max(1, min(self.max_workers, len(pending)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="listing-quality") as pool:
+                sample = self._rendition_sample(pending) if self.rendition_size and not foreground else []
+                if sample:
+                    self._store_results(sample, self._check_rendition(pool, sample, metrics), stale, ratings, metrics)
+                    sampled = set(sample)
+                    pending = [url for url in pending if url not in sampled]
+                for start in range(0, len(pending), self.batch_size):
+                    batch = pending[start:start + self.batch_size]
+                    fetch_urls = [self._fetch_url(url) for url in batch]
+                    validators = {fetch_url: stale[url][2:] for url, fetch_url in zip(batch, fetch_urls) if url in stale}
+                    results = self._measure_batch(pool, fetch_urls, metrics, validators, foreground)
+                    self._store_results(batch, results, stale, ratings, metrics)
+            if metrics:
+                metrics.record_detail("download_scheduler", self.scheduler.stats())
+
+        return [ratings.get(url, "Error") if isinstance(url, str) else "Error" for url in image_urls]
+
+    def _fetch_url(self, image_url: str) -> str:
+        if self.rendition_size:
+            with self._rendition_lock:
+                enabled = (self.rendition_check or {}).get("enabled")
+            if enabled:
+                return rendition_url(image_url, self.rendition_size)
+        return image_url
+
+    def _rendition_sample(self, pending: list) -> list:
+        """
+        The URLs of `pending` to rate at both sizes, or [] once decided.
+        """
+        with self._rendition_lock:
+            if self.rendition_check is not None:
+                return []
+            needed = self.rendition_sample - len(self._rendition_pairs)
+        return random.Random(0).sample(pending, max(0, min(needed, len(pending))))
+
+    def _check_rendition(self, pool: ThreadPoolExecutor, sample: list, metrics: PipelineMetrics = None) -> list:
+        """
+        Rates `sample` from both the full and the small rendition and adds the
+        pairs to those compared so far. Once there are `min_rendition_pairs`,
+        decides whether to use the small rendition from now on. Returns the
+        full-rendition results.
+        """
+        full = self._measure_batch(pool, sample, metrics)
+        small = self._measure_batch(pool, [rendition_url(url, self.rendition_size) for url in sample], metrics)
+        with self._rendition_lock:
+            if self.rendition_check is not None:
+                return full
+            self._rendition_pairs.extend((f[0], s[0]) for f, s in zip(full, small) if f is not None and s is not None)
+            pairs = self._rendition_pairs
+            if len(pairs) < self.min_rendition_pairs:
+                return full
+            agreed = sum(self._label(a) == self._label(b) for a, b in pairs)
+            self.rendition_check = {
+                "rendition_size": self.rendition_size,
+                "compared": len(pairs),
+                "agreed": agreed,
+                "agreement": agreed / len(pairs),
+                "max_coverage_difference": max(abs(a - b) for a, b in pairs),
+                "enabled": agreed / len(pairs) >= self.min_rendition_agreement,
+            }
+            check = dict(self.rendition_check)
+        if metrics:
+            metrics.record_detail("rendition_check", check)
+        return full
+
+    def _store_results(self, urls: list, results: list, stale: dict, ratings: dict, metrics: PipelineMetrics = None):
+        fresh = []
+        for url, result in zip(urls, results):
+            if result is None:
+                continue
+            coverage, etag, last_modified = result
+            if coverage is NOT_MODIFIED:
+                coverage = stale[url][0]
+            fresh.append((url, coverage, self._label(coverage), etag, last_modified))
+        if self.cache:
+            self.cache.put_many(fresh)
+        ratings.update({url: label for url, _, label, *_ in fresh})
+        if metrics:
+            metrics.count("images_done", len(urls))
+
+    def _measure_batch(self, pool: ThreadPoolExecutor, image_urls: list, metrics: PipelineMetrics = None,
+                       validators: dict = None, foreground: bool = False) -> list:
+        """
+        Returns `(coverage, etag, last_modified)` per URL, or None where it
+        failed. URLs with `validators` are requested conditionally.
+        """
+        validators = validators or {}
+        if not self.analyzer.processes:
+            # Analyze on the download threads; OpenCV releases the GIL while it works.
+            return list(pool.map(lambda url: self._fetch_coverage(url, metrics, validators.get(url), foreground), image_urls))
+        results = list(pool.map(lambda url: self._fetch_content(url, metrics, validators.get(url), foreground), image_urls))
+        fetched = [i for i, result in enumerate(results) if result is not None and result[0] is not NOT_MODIFIED]
+        started = time.perf_counter()
+        for i, coverage in zip(fetched, self.analyzer.coverage_many([results[i][0] for i in fetched])):
+            results[i] = (coverage, *results[i][1:]) if coverage is not None else None
+            if coverage is None and metrics:
+                metrics.record_error("decode_error")
+        if metrics:
+            metrics.add_stage_time("image_decode", time.perf_counter() - started, len(fetched))
+        return results
+
+    def _fetch_content(self, image_url: str, metrics: PipelineMetrics = None, validators: tuple = None,
+                       foreground: bool = False):
+        """
+        Downloads an image and returns `(content, etag, last_modified)`, or None
+        on failure. Given the `(etag, last_modified)` of an earlier download,
+        the request is conditional, and an unchanged image comes back with
+        `NOT_MODIFIED` as its content.
+        """
+        etag, last_modified = validators or (None, None)
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        try:
+            started = time.perf_counter()
+            response = self.scheduler.get(self._get_session(), image_url, metrics=metrics, foreground=foreground,
+                                          timeout=self.timeout, headers=headers)
+            if response.status_code == 304 and headers:
+                if metrics:
+                    metrics.count("not_modified")
+                return (NOT_MODIFIED, response.headers.get('ETag', etag),
+                        response.headers.get('Last-Modified', last_modified))
+            response.raise_for_status()
+            content = response.content
+        except Exception as error:
+            if metrics:
+                metrics.record_error(_error_type(error))
+            return None
+        if metrics:
+            metrics.record_download(len(content), time.perf_counter() - started)
+        return content, response.headers.get('ETag'), response.headers.get('Last-Modified')
+
+    def _fetch_coverage(self, image_url: str, metrics: PipelineMetrics = None, validators: tuple = None,
+                        foreground: bool = False):
+        fetched = self._fetch_content(image_url, metrics, validators, foreground)
+        if fetched is None or fetched[0] is NOT_MODIFIED:
+            return fetched
+        content, etag, last_modified = fetched
+        started = time.perf_counter()
+        try:
+            coverage = self.analyzer.coverage(content)
+        except Exception as error:
+            if metrics:
+                metrics.record_error(_error_type(error))
+            return None
+        if metrics:
+            metrics.record_decode(time.perf_counter() - started)
+        return coverage, etag, last_modified
+
+    def _get_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                session.headers.update(self._headers)
+                adapter = HTTPAdapter(pool_connections=max(1, self.max_workers),
+                                      pool_maxsize=max(1, self.scheduler.max_limit))
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    @staticmethod
+    def _label(coverage_percentage: float) -> str:
+        # 5. Assign score based on your logic
+        if coverage_percentage > 70:
+            return "Good"
+        elif coverage_percentage >= 50:
+            return "Average"
+        else:
+            return "Poor"
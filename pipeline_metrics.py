@@ -0,0 +1,173 @@
+# File: pipeline_metrics.py
+import cProfile
+import io
+import json
+import math
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+class Histogram:
+    """
+    Fixed-bucket histogram; each bucket counts the values up to its upper bound.
+    """
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds) + (math.inf,)
+        self.counts = [0] * len(self.bounds)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": (self.total / self.count) if self.count else 0.0,
+            "max": self.max,
+            "buckets": {("inf" if bound == math.inf else f"<={bound:g}"): count
+                        for bound, count in zip(self.bounds, self.counts)},
+        }
+
+class PipelineMetrics:
+    """
+    Collects where one processing run spends its time: wall time and row counts
+    per stage, per-image download size and latency, image errors by type, and
+    plain counters. With `profile` on, each stage also runs under cProfile.
+    Safe to update from worker threads.
+    """
+    LATENCY_BOUNDS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+    SIZE_BOUNDS_KB = (10, 25, 50, 100, 250, 500, 1000)
+
+    def __init__(self, profile: bool = False):
+        self.profile = profile
+        self.stages = {}
+        self.counters = {}
+        self.errors = {}
+        self.details = {}
+        self.download_latency_ms = Histogram(self.LATENCY_BOUNDS_MS)
+        self.download_size_kb = Histogram(self.SIZE_BOUNDS_KB)
+        self.decode_ms = Histogram(self.LATENCY_BOUNDS_MS)
+        self._profile_stats = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, rows: int = None):
+        """
+        Times the enclosed block as stage `name`. Repeated stages add up. The
+        yielded dict's "rows" can be set inside the block when the row count is
+        only known afterwards.
+        """
+        record = {"rows": rows}
+        profiler = self._start_profiler()
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self._stop_profiler(profiler)
+            self.add_stage_time(name, time.perf_counter() - started, record["rows"])
+
+    def add_stage_time(self, name: str, seconds: float, rows: int = None):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"seconds": 0.0, "rows": 0, "calls": 0})
+            stage["seconds"] += seconds
+            stage["rows"] += rows or 0
+            stage["calls"] += 1
+
+    def record_download(self, size_bytes: int, latency_s: float):
+        with self._lock:
+            self.download_size_kb.add(size_bytes / 1024)
+            self.download_latency_ms.add(latency_s * 1000)
+            self.counters["download_bytes"] = self.counters.get("download_bytes", 0) + size_bytes
+
+    def record_decode(self, seconds: float):
+        with self._lock:
+            self.decode_ms.add(seconds * 1000)
+
+    def record_error(self, error_type: str):
+        with self._lock:
+            self.errors[error_type] = self.errors.get(error_type, 0) + 1
+
+    def record_detail(self, name: str, value):
+        """
+        Attaches a JSON-serializable report, such as a memory breakdown, to the run.
+        """
+        with self._lock:
+            self.details[name] = value
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def image_progress(self) -> float:
+        """
+        Fraction of the distinct images seen so far that have been rated, or
+        downloaded and failed.
+        """
+        with self._lock:
+            total = self.counters.get("images_unique", 0)
+            return min(1.0, self.counters.get("images_done", 0) / total) if total else 0.0
+
+    def profile_report(self, limit: int = 25) -> str:
+        """
+        Returns the cumulative-time cProfile table for all stages, or "" when
+        profiling is off.
+        """
+        with self._lock:
+            if self._profile_stats is None:
+                return ""
+            out = io.StringIO()
+            stats = pstats.Stats(stream=out)
+            stats.add(self._profile_stats)
+            stats.sort_stats("cumulative").print_stats(limit)
+            return out.getvalue()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            stages = {
+                name: {**stage, "rows_per_s": (stage["rows"] / stage["seconds"]) if stage["seconds"] else 0.0}
+                for name, stage in self.stages.items()
+            }
+            return {
+                "stages": stages,
+                "downloads": {
+                    "latency_ms": self.download_latency_ms.to_dict(),
+                    "size_kb": self.download_size_kb.to_dict(),
+                },
+                "decode_ms": self.decode_ms.to_dict(),
+                "errors": dict(self.errors),
+                "counters": dict(self.counters),
+                "details": dict(self.details),
+            }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def _start_profiler(self):
+        if not self.profile:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread.
+            return None
+        return profiler
+
+    def _stop_profiler(self, profiler):
+        if profiler is None:
+            return
+        profiler.disable()
+        with self._lock:
+            if self._profile_stats is None:
+                self._profile_stats = pstats.Stats(profiler)
+            else:
+                self._profile_stats.add(profiler)
@@ -0,0 +1,243 @@
+# File: precompute.py
+"""
+Headless precompute step: runs the full processing pipeline over every
+category CSV and writes the result as an Arrow IPC file the app memory-maps
+on start-up.
+
+    python precompute.py                      # every products_*.csv
+    python precompute.py products_electronics.csv --force
+    python precompute.py huge_scrape.csv --chunk-rows 100000
+    python precompute.py --image-size 100      # rate images from 100px renditions
+
+With --chunk-rows the CSV is streamed through the pipeline and the artifact is
+written chunk by chunk, so memory stays bounded for very large files.
+`stream_process_csv` does the same for Parquet or CSV output.
+
+When a CSV changes, rows that were already in its previous artifact (same raw
+fields) reuse their identified item and listing quality, so a re-scrape only
+pays for new or changed rows. --force recomputes everything.
+"""
+import argparse
+import glob
+import hashlib
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from data_pipeline import REUSABLE_COLUMNS, iter_processed_chunks, process_csv
+from listing_quality_evaluator import ListingQualityEvaluator
+from pipeline_metrics import PipelineMetrics
+
+SCHEMA_VERSION = 3
+ARTIFACT_DIR = ".prism_artifacts"
+
+_SCHEMA_VERSION_KEY = b"prism.schema_version"
+_SOURCE_FINGERPRINT_KEY = b"prism.source_sha256"
+
+# Fixed column types for streamed output, so every chunk matches the first one
+# even when, say, one chunk's prices happen to have no missing values.
+PROCESSED_SCHEMA = pa.schema([
+    ('Image', pa.string()),
+    ('Title', pa.string()),
+    ('Price', pa.float64()),
+    ('Ratings', pa.string()),
+    ('Review', pa.float64()),
+    ('Monthly Sales', pa.string()),
+    ('Row Fingerprint', pa.uint64()),
+    ('Ratings_Num', pa.float64()),
+    ('Cleaned Sales', pa.int64()),
+    ('Identified Item', pa.string()),
+    ('Listing Quality', pa.string()),
+    ('PRISM Score', pa.int64()),
+    ('Potential', pa.string()),
+    ('Missing Data', pa.bool_()),
+])
+
+def fingerprint_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def artifact_path(csv_path: str, artifact_dir: str = ARTIFACT_DIR) -> str:
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(artifact_dir, f"{stem}.arrow")
+
+def write_artifact(df, csv_path: str, artifact_dir: str = ARTIFACT_DIR) -> str:
+    """
+    Writes a processed frame next to the schema version and the fingerprint of
+    the CSV it came from. The file is replaced atomically.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_SCHEMA_VERSION_KEY] = str(SCHEMA_VERSION).encode()
+    metadata[_SOURCE_FINGERPRINT_KEY] = fingerprint_file(csv_path).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    path = artifact_path(csv_path, artifact_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+def write_processed_stream(chunks, output_path: str, metadata: dict = None) -> int:
+    """
+    Writes processed frames to `output_path` one at a time and returns the row
+    count. The format follows the extension: `.parquet`, `.csv`, or otherwise
+    an Arrow IPC file. The file is replaced atomically once complete.
+    """
+    schema = PROCESSED_SCHEMA.with_metadata(metadata or {})
+    extension = os.path.splitext(output_path)[1].lower()
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    rows = 0
+    if extension == ".csv":
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            for chunk in chunks:
+                chunk.to_csv(f, index=False, header=(rows == 0))
+                rows += len(chunk)
+    elif extension == ".parquet":
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            for chunk in chunks:
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                rows += len(chunk)
+    else:
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for chunk in chunks:
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                rows += len(chunk)
+    os.replace(tmp_path, output_path)
+    return rows
+
+def stream_process_csv(csv_path: str, output_path: str, chunk_rows: int = 50_000, **kwargs) -> int:
+    """
+    Processes a CSV of any size `chunk_rows` rows at a time straight into
+    `output_path`. Returns the number of rows written.
+    """
+    return write_processed_stream(iter_processed_chunks(csv_path, chunk_rows, **kwargs), output_path)
+
+def read_artifact_table(csv_path: str, artifact_dir: str = ARTIFACT_DIR, require_current: bool = True):
+    """
+    Memory-maps the artifact for `csv_path` and returns it as an Arrow table,
+    or None if it is missing, from another schema version, or (unless
+    `require_current` is off) built from a different version of the CSV.
+    """
+    path = artifact_path(csv_path, artifact_dir)
+    if not os.path.exists(path) or not os.path.exists(csv_path):
+        return None
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+    metadata = table.schema.metadata or {}
+    if metadata.get(_SCHEMA_VERSION_KEY) != str(SCHEMA_VERSION).encode():
+        return None
+    if require_current and metadata.get(_SOURCE_FINGERPRINT_KEY) != fingerprint_file(csv_path).encode():
+        return None
+    return table
+
+def artifact_is_current(csv_path: str, artifact_dir: str = ARTIFACT_DIR) -> bool:
+    return read_artifact_table(csv_path, artifact_dir) is not None
+
+def load_artifact(csv_path: str, artifact_dir: str = ARTIFACT_DIR):
+    """
+    Returns the precomputed frame for `csv_path`, or None if there is no current artifact.
+
+    Text columns come back as Arrow-backed strings that point into the
+    memory-mapped file, and numeric columns without missing values are
+    zero-copy views of it. Only numeric columns with missing values are
+    copied, to turn their nulls into NaN.
+    """
+    table = read_artifact_table(csv_path, artifact_dir)
+    if table is None:
+        return None
+    return table.to_pandas(split_blocks=True, types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
+
+def load_previous_results(csv_path: str, artifact_dir: str = ARTIFACT_DIR):
+    """
+    Returns the row fingerprints and reusable columns of the artifact for
+    `csv_path` even if the CSV has changed since, or None if there is none.
+    """
+    table = read_artifact_table(csv_path, artifact_dir, require_current=False)
+    if table is None:
+        return None
+    return table.select(['Row Fingerprint'] + REUSABLE_COLUMNS).to_pandas()
+
+def previous_results_lookup(csv_path: str, artifact_dir: str = ARTIFACT_DIR):
+    """
+    Like `load_previous_results`, but returns a function from an array of row
+    fingerprints to the previous rows with those fingerprints, or None. Each
+    call filters the memory-mapped artifact, so only the matching rows of one
+    chunk are ever copied into memory.
+    """
+    table = read_artifact_table(csv_path, artifact_dir, require_current=False)
+    if table is None:
+        return None
+    table = table.select(['Row Fingerprint'] + REUSABLE_COLUMNS)
+
+    def lookup(fingerprints):
+        wanted = pc.is_in(table['Row Fingerprint'], value_set=pa.array(fingerprints, type=pa.uint64()))
+        return table.filter(wanted).to_pandas()
+    return lookup
+
+def _reuse_summary(metrics: PipelineMetrics) -> str:
+    return (f"reused {metrics.counters.get('rows_reused', 0)}, "
+            f"recomputed {metrics.counters.get('rows_recomputed', 0)}")
+
+def precompute(csv_path: str, artifact_dir: str = ARTIFACT_DIR, force: bool = False,
+               chunk_rows: int = None, image_size: int = None) -> str:
+    """
+    Processes one CSV and writes its artifact, unless a current one already
+    exists. Rows unchanged since the previous artifact are reused unless
+    `force` is set. With `chunk_rows`, the CSV is streamed instead of loaded
+    whole. `image_size` is passed to the `ListingQualityEvaluator` as its
+    `rendition_size`.
+    """
+    if not force and artifact_is_current(csv_path, artifact_dir):
+        return "up to date"
+    metrics = PipelineMetrics()
+    quality_engine = ListingQualityEvaluator(rendition_size=image_size)
+    if chunk_rows:
+        if not os.path.exists(csv_path):
+            return "not found"
+        metadata = {
+            _SCHEMA_VERSION_KEY: str(SCHEMA_VERSION).encode(),
+            _SOURCE_FINGERPRINT_KEY: fingerprint_file(csv_path).encode(),
+        }
+        previous = None if force else previous_results_lookup(csv_path, artifact_dir)
+        chunks = iter_processed_chunks(csv_path, chunk_rows, metrics=metrics, previous=previous,
+                                       quality_engine=quality_engine)
+        rows = write_processed_stream(chunks, artifact_path(csv_path, artifact_dir), metadata)
+        return f"wrote {rows} rows in chunks of {chunk_rows} ({_reuse_summary(metrics)})"
+    previous = None if force else load_previous_results(csv_path, artifact_dir)
+    df = process_csv(csv_path, metrics=metrics, previous=previous, quality_engine=quality_engine)
+    if df is None:
+        return "not found"
+    write_artifact(df, csv_path, artifact_dir)
+    return f"wrote {len(df)} rows ({_reuse_summary(metrics)})"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute processed PRISM category artifacts.")
+    parser.add_argument("csv_paths", nargs="*", help="Category CSVs (default: products_*.csv)")
+    parser.add_argument("--out-dir", default=ARTIFACT_DIR, help="Artifact directory")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the artifact is current")
+    parser.add_argument("--chunk-rows", type=int, help="Stream the CSV in chunks of this many rows")
+    parser.add_argument("--image-size", type=int,
+                        help="Rate images from this smaller CDN rendition once a sample confirms the labels agree")
+    args = parser.parse_args(argv)
+
+    for csv_path in args.csv_paths or sorted(glob.glob("products_*.csv")):
+        started = time.perf_counter()
+        status = precompute(csv_path, args.out_dir, args.force, args.chunk_rows, args.image_size)
+        print(f"{csv_path}: {status} ({time.perf_counter() - started:.2f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -5,15 +5,39 @@ import re
 import math
 import urllib.parse
 import random
-import requests
-import cv2
-import numpy as np
 import os
+import json
+import time
+from functools import partial
 
 # --- Import Engines ---
-from item_identifier import ItemIdentifier
+from compact_frame import compact_products, memory_report, rating_text, report_details
+from data_pipeline import clean_products, process_csv, read_products
+from frame_store import FrameStore
 from listing_quality_evaluator import ListingQualityEvaluator
-from prism_score_evaluator import PrismScoreEvaluator
+from pipeline_metrics import PipelineMetrics
+from precompute import artifact_is_current, load_artifact, load_previous_results
+from product_index import SORT_COLUMNS, ProductIndex
+from progressive_loader import ProgressiveCategory
+from scoring_rules import DEFAULT_RULES, ScoringRules, load_rules
+
+# Without a current precomputed artifact, show products while images are still being scored.
+PROGRESSIVE_LOADING = os.environ.get("PRISM_PROGRESSIVE_LOADING", "1") == "1"
+LOOKAHEAD = 3
+# Process every category in background workers as soon as the server starts.
+WARMUP = os.environ.get("PRISM_WARMUP", "0") == "1"
+# Run every processing stage under cProfile and show the report in the diagnostics panel.
+PROFILE_PIPELINE = os.environ.get("PRISM_PROFILE_PIPELINE", "0") == "1"
+# Memory budget for processed category frames kept in memory for all sessions.
+FRAME_BUDGET_MB = int(os.environ.get("PRISM_FRAME_BUDGET_MB", "1024"))
+# Keep processed frames in the compact layout (categoricals, Arrow strings, narrow numbers).
+COMPACT_FRAMES = os.environ.get("PRISM_COMPACT_FRAMES", "0") == "1"
+# Rate images from this smaller CDN rendition (e.g. 100 px) once a sample shows the labels agree.
+IMAGE_SIZE = int(os.environ.get("PRISM_IMAGE_SIZE", "0")) or None
+# JSON rule set the scoring-rules editor starts from (default: the built-in rules).
+SCORING_RULES_PATH = os.environ.get("PRISM_SCORING_RULES")
+SCORE_COLUMNS = ['PRISM Score', 'Potential', 'Missing Data']
+QUERY_PAGE_SIZES = [25, 50, 100]
 
 # --- Page Configuration and CSS ---
 st.set_page_config(page_title="PRISM", page_icon="🚀", layout="wide")
@@ -123,25 +147,255 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+CATEGORIES = {
+    "Car & Motorbike": "products_car_&_motorbike.csv",
+    "Electronics": "products_electronics.csv",
+    "Sports, Fitness & Outdoors": "products_sports,_fitness_&_outdoors.csv",
+    "Tools & Home Improvement": "products_tools_&_home_improvement.csv"
+}
+
 # --- Data Loading and Helper Functions ---
-@st.cache_data
+@st.cache_resource
+def pipeline_metrics():
+    """Latest processing metrics per category CSV, shared by every session."""
+    return {}
+
+@st.cache_resource
+def frame_store():
+    """Processed category frames, shared read-only by every session and rerun."""
+    return FrameStore(budget_bytes=FRAME_BUDGET_MB * 2**20)
+
 def load_and_process_data(csv_path):
+    return frame_store().get(csv_path, _category_loader())
+
+@st.cache_resource
+def start_warmup():
+    """Starts processing every category in background workers, once per server process."""
+    return frame_store().prefetch(CATEGORIES.values(), _category_loader())
+
+def _category_loader():
+    # Resolve the shared registry here so the loader can also run on worker threads.
+    return partial(_process_category, metrics_registry=pipeline_metrics())
+
+def _process_category(csv_path, metrics_registry):
+    metrics = PipelineMetrics(profile=PROFILE_PIPELINE)
+    metrics_registry[csv_path] = metrics
+    with metrics.stage("load_artifact") as stage:
+        df = load_artifact(csv_path)
+        stage["rows"] = len(df) if df is not None else 0
+    if df is None:
+        # Rows unchanged since a stale artifact reuse its results.
+        df = process_csv(csv_path, metrics=metrics, previous=load_previous_results(csv_path),
+                         quality_engine=ListingQualityEvaluator(rendition_size=IMAGE_SIZE))
+    if df is not None and COMPACT_FRAMES:
+        with metrics.stage("compact", rows=len(df)):
+            compact = compact_products(df)
+        report = memory_report(df, compact)
+        metrics.record_detail("memory_by_column", report_details(report))
+        df = compact
+    return df
+
+def load_progressive_category(csv_path):
+    """
+    A category scored in the background, kept in the frame store under its
+    own key so it counts against the same memory budget as full frames.
+    """
+    registry = pipeline_metrics()
+    def load(key):
+        metrics = PipelineMetrics(profile=PROFILE_PIPELINE)
+        registry[csv_path] = metrics
+        return ProgressiveCategory.from_csv(csv_path, metrics=metrics, compact=COMPACT_FRAMES,
+                                            quality_engine=ListingQualityEvaluator(rendition_size=IMAGE_SIZE))
+    return frame_store().get(f"{csv_path}#progressive", load)
+
+def loads_progressively(csv_path):
+    """
+    Whether to browse `csv_path` progressively. During warm-up the category is
+    already being processed in full, so that work is joined instead, as is a
+    full frame the search view has loaded. A progressive category already in
+    the store is reused without checking the artifact (and hashing the CSV)
+    again on every rerun.
+    """
+    store = frame_store()
+    if not PROGRESSIVE_LOADING or WARMUP or csv_path in store or store.is_loading(csv_path):
+        return False
+    key = f"{csv_path}#progressive"
+    return key in store or store.is_loading(key) or not artifact_is_current(csv_path)
+
+def default_rules_text():
+    rules = load_rules(SCORING_RULES_PATH) if SCORING_RULES_PATH else DEFAULT_RULES
+    return json.dumps(rules, indent=2)
+
+@st.cache_resource
+def compiled_rules(rules_text):
+    """
+    Parses and compiles a JSON rule set; raises ValueError if it is invalid.
+    """
+    return ScoringRules(json.loads(rules_text))
+
+@st.cache_resource
+def rules_trial_frame(csv_path):
+    """
+    The first rows of a category, cleaned, with every listing quality label,
+    for trying out a rule set before it is applied. None if the CSV is missing.
+    """
     try:
-        df = pd.read_csv(csv_path, dtype={'Monthly Sales': str})
-    except FileNotFoundError: return None
-    df['Price'] = pd.to_numeric(df['Price'].astype(str).str.replace(',', ''), errors='coerce')
-    df['Review'] = pd.to_numeric(df['Review'].astype(str).str.replace(',', ''), errors='coerce')
-    df['Ratings_Num'] = df['Ratings'].str.extract(r'(\d\.\d)').astype(float)
-    df['Cleaned Sales'] = df['Monthly Sales'].str.lower().str.replace('k', '000').str.extract(r'(\d+)').astype(float).fillna(0).astype(int)
-    item_engine = ItemIdentifier()
-    quality_engine = ListingQualityEvaluator()
-    score_engine = PrismScoreEvaluator()
-    df['Identified Item'] = df['Title'].apply(item_engine.identify)
-    df['Listing Quality'] = df['Image'].apply(quality_engine.get_score)
-    scores = df.apply(score_engine.get_score, axis=1)
-    df[['PRISM Score', 'Potential', 'Missing Data']] = pd.DataFrame(scores.tolist(), index=df.index)
+        df = clean_products(read_products(csv_path).head(200))
+    except FileNotFoundError:
+        return None
+    labels = ['Poor', 'Average', 'Good', 'Error', None]
+    df['Listing Quality'] = [labels[i % len(labels)] for i in range(len(df))]
     return df
 
+def trial_score(rules, csv_path):
+    """
+    Scores a sample of the category with `rules`, both as a frame and row by
+    row, so a rule set that cannot score real data fails here rather than on
+    every rerun.
+    """
+    sample = rules_trial_frame(csv_path)
+    if sample is not None and len(sample):
+        rules.score_frame(sample)
+        rules.score_row(sample.iloc[0])
+
+def category_scores(csv_path, df, rules):
+    """
+    Scores of a loaded category under `rules`, kept in the frame store next to
+    the category so switching back to a rule set costs nothing. They are
+    dropped when the category is evicted, so a reloaded category is rescored.
+    """
+    def rescore(key):
+        metrics = pipeline_metrics().get(csv_path) or PipelineMetrics()
+        with metrics.stage("rescore", rows=len(df)):
+            return rules.score_frame(df)
+    return frame_store().get(f"{csv_path}#scores:{rules.key}", rescore, parent=csv_path)
+
+def render_scoring_rules_editor():
+    with st.expander("⚖️ Scoring rules"):
+        st.text_area("Rules (JSON)", value=st.session_state.scoring_rules, height=320, key="scoring_rules_text")
+        apply_col, reset_col = st.columns(2)
+        if apply_col.button("Apply", use_container_width=True, key="apply_rules"):
+            try:
+                rules = compiled_rules(st.session_state.scoring_rules_text)
+                trial_score(rules, CATEGORIES[st.session_state.selected_category])
+            except Exception as error:
+                st.error(f"Invalid scoring rules: {error}")
+            else:
+                st.session_state.scoring_rules = st.session_state.scoring_rules_text
+                st.rerun()
+        if reset_col.button("Reset", use_container_width=True, key="reset_rules"):
+            st.session_state.scoring_rules = default_rules_text()
+            del st.session_state["scoring_rules_text"]
+            st.rerun()
+
+def product_index(rules_text):
+    """
+    The cross-category query index, scored with `rules_text`. Loads every
+    category in full, in parallel, through the frame store, and is kept there
+    itself so each index counts against the memory budget.
+    """
+    rules = compiled_rules(rules_text)
+    def build(key):
+        custom_rules = rules.key != ScoringRules().key
+        loads = frame_store().prefetch(CATEGORIES.values(), _category_loader())
+        frames = {}
+        for category, csv_path in CATEGORIES.items():
+            df = loads[csv_path].result()
+            if df is not None and custom_rules:
+                df = df.drop(columns=SCORE_COLUMNS).join(category_scores(csv_path, df, rules))
+            frames[category] = df
+        return ProductIndex(frames)
+    return frame_store().get(f"#index:{rules.key}", build)
+
+def open_product(category, row, category_size):
+    """Switches to browsing `category`, starting at `row` and shuffling the rest."""
+    others = [index for index in range(category_size) if index != row]
+    random.shuffle(others)
+    st.session_state.selected_category = category
+    st.session_state.current_category = category
+    st.session_state.shuffled_indices = [row] + others
+    st.session_state.product_pointer = 0
+    st.session_state.view = "browse"
+
+def render_query_view():
+    st.subheader("🔎 Search all categories")
+    with st.spinner("Indexing every category..."):
+        index = product_index(st.session_state.scoring_rules)
+    potential_rules = compiled_rules(st.session_state.scoring_rules).rules["potential"]
+    potential_labels = [band["label"] for band in potential_rules["bands"]] + [potential_rules["default"]]
+
+    keywords = st.text_input("Identified item contains", placeholder="e.g. bottle", key="query_keywords")
+    filter_col1, filter_col2, filter_col3 = st.columns(3)
+    potential = filter_col1.multiselect("Potential", potential_labels, key="query_potential")
+    categories = filter_col2.multiselect("Categories", list(CATEGORIES), placeholder="All categories",
+                                         key="query_categories")
+    min_score = filter_col3.slider("Minimum PRISM Score", 0, 100, 0, key="query_min_score")
+    range_col1, range_col2, range_col3 = st.columns(3)
+    min_price = range_col1.number_input("Min price (₹)", min_value=0, value=None, key="query_min_price")
+    max_price = range_col2.number_input("Max price (₹)", min_value=0, value=None, key="query_max_price")
+    min_sales = range_col3.number_input("Min monthly sales", min_value=0, value=None, key="query_min_sales")
+    sort_col1, sort_col2, sort_col3 = st.columns(3)
+    sort_by = sort_col1.selectbox("Sort by", SORT_COLUMNS, key="query_sort_by")
+    order = sort_col2.selectbox("Order", ["Highest first", "Lowest first"], key="query_order")
+    page_size = sort_col3.selectbox("Per page", QUERY_PAGE_SIZES, index=1, key="query_page_size")
+
+    query = dict(keywords=keywords, potential=potential, categories=categories or None,
+                 ranges={'PRISM Score': (min_score or None, None), 'Price': (min_price, max_price),
+                         'Cleaned Sales': (min_sales, None)},
+                 sort_by=sort_by, descending=order == "Highest first")
+    # Any change to the query starts again from its first page.
+    if st.session_state.get("query_signature") != repr((query, page_size)):
+        st.session_state.query_signature = repr((query, page_size))
+        st.session_state.query_page = 0
+
+    started = time.perf_counter()
+    page, total = index.query(**query, offset=st.session_state.query_page * page_size, limit=page_size)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    page_count = max(1, math.ceil(total / page_size))
+    st.caption(f"{total:,} of {len(index):,} products match, found in {elapsed_ms:.1f} ms. "
+               f"Page {st.session_state.query_page + 1} of {page_count}. Select a row to open the product.")
+
+    event = st.dataframe(
+        page.drop(columns=['Row']), hide_index=True, use_container_width=True,
+        on_select="rerun", selection_mode="single-row",
+        key=f"query_results_{st.session_state.get('query_opened', 0)}",
+        column_config={
+            "Image": st.column_config.ImageColumn("Image"),
+            "Price": st.column_config.NumberColumn("Price", format="₹%d"),
+            "PRISM Score": st.column_config.ProgressColumn("PRISM Score", min_value=0, max_value=100, format="%d"),
+        },
+    )
+    if event.selection.rows:
+        product = page.iloc[event.selection.rows[0]]
+        # A fresh table key next time, so the selection does not reopen the product.
+        st.session_state.query_opened = st.session_state.get("query_opened", 0) + 1
+        open_product(product['Category'], int(product['Row']), len(index.categories[product['Category']]))
+        st.rerun()
+
+    prev_col, next_col = st.columns(2)
+    if prev_col.button("← Previous page", use_container_width=True, key="query_prev",
+                       disabled=st.session_state.query_page == 0):
+        st.session_state.query_page -= 1
+        st.rerun()
+    if next_col.button("Next page →", use_container_width=True, key="query_next",
+                       disabled=st.session_state.query_page + 1 >= page_count):
+        st.session_state.query_page += 1
+        st.rerun()
+
+def render_warmup_status():
+    store, registry = frame_store(), pipeline_metrics()
+    st.markdown("**Warm-up**")
+    for category, csv_path in CATEGORIES.items():
+        status = store.status(csv_path)
+        if status == "ready":
+            st.caption(f"✓ {category}")
+        elif status == "failed":
+            st.caption(f"✗ {category}: failed to load")
+        else:
+            metrics = registry.get(csv_path)
+            progress = metrics.image_progress() if metrics else 0.0
+            st.progress(progress, text=f"{category}: {progress:.0%} of images")
+
 def get_rating_stars(rating_text: str):
     if not isinstance(rating_text, str): return "N/A"
     match = re.search(r'(\d\.\d)', rating_text)
@@ -157,6 +411,56 @@ def clean_sales_text(sales_text: str):
     if not isinstance(sales_text, str): return "N/A"
     return sales_text.split(" ")[0]
 
+def render_diagnostics(metrics: PipelineMetrics, csv_path: str):
+    with st.expander("🛠 Diagnostics"):
+        store = frame_store().stats()
+        st.caption(f"Shared frame store: {len(store['frames'])} frames, "
+                   f"{store['used_bytes'] / 2**20:,.1f} of {store['budget_bytes'] / 2**20:,.0f} MB.")
+        if metrics is None:
+            st.caption("No processing metrics have been recorded for this category in this server process.")
+            return
+        report = metrics.to_dict()
+        stages = pd.DataFrame.from_dict(report["stages"], orient="index")
+        if not stages.empty:
+            st.markdown("**Stages**")
+            st.dataframe(stages.style.format({"seconds": "{:.3f}", "rows_per_s": "{:,.0f}"}), use_container_width=True)
+
+        downloads = report["downloads"]
+        stat_col1, stat_col2, stat_col3 = st.columns(3)
+        stat_col1.metric("Images downloaded", f"{downloads['latency_ms']['count']:,}")
+        stat_col2.metric("Mean latency", f"{downloads['latency_ms']['mean']:,.0f} ms")
+        stat_col3.metric("Downloaded", f"{report['counters'].get('download_bytes', 0) / 1e6:,.1f} MB")
+        if downloads["latency_ms"]["count"]:
+            hist_col1, hist_col2 = st.columns(2)
+            hist_col1.caption("Download latency (ms)")
+            hist_col1.bar_chart(pd.Series(downloads["latency_ms"]["buckets"]))
+            hist_col2.caption("Image size (KB)")
+            hist_col2.bar_chart(pd.Series(downloads["size_kb"]["buckets"]))
+
+        if "memory_by_column" in report["details"]:
+            st.markdown("**Memory by column (compact layout)**")
+            st.dataframe(pd.DataFrame.from_dict(report["details"]["memory_by_column"], orient="index"),
+                         use_container_width=True)
+
+        if "rendition_check" in report["details"]:
+            st.markdown("**Small image rendition check**")
+            st.json(report["details"]["rendition_check"])
+
+        if "download_scheduler" in report["details"]:
+            st.markdown("**Image hosts**")
+            st.dataframe(pd.DataFrame.from_dict(report["details"]["download_scheduler"], orient="index"),
+                         use_container_width=True)
+
+        st.markdown("**Image errors**")
+        st.json(report["errors"] or {"none": 0})
+        st.markdown("**Counters**")
+        st.json(report["counters"])
+        if metrics.profile:
+            st.markdown("**Profile**")
+            st.code(metrics.profile_report())
+        st.download_button("Export metrics as JSON", data=metrics.to_json(indent=2),
+                           file_name=f"{os.path.splitext(csv_path)[0]}_metrics.json", mime="application/json")
+
 def generate_amazon_link(title: str):
     base_url = "https://www.amazon.in/s?k="
     search_query = urllib.parse.quote_plus(title)
@@ -173,6 +477,9 @@ def main():
     st.image("prism_logo_new.png")
     st.markdown("<p>Product Research and Integrated Supply Module</p></div>", unsafe_allow_html=True)
     
+    if WARMUP:
+        start_warmup()
+
     # --- Session State Initialization ---
     if 'sidebar_state' not in st.session_state:
         st.session_state.sidebar_state = 'expanded'
@@ -184,6 +491,10 @@ def main():
         st.session_state.product_pointer = 0
     if 'current_category' not in st.session_state:
         st.session_state.current_category = ""
+    if 'scoring_rules' not in st.session_state:
+        st.session_state.scoring_rules = default_rules_text()
+    if 'view' not in st.session_state:
+        st.session_state.view = "browse"
 
     # --- Layout with Custom Navigation Pane ---
     if st.session_state.sidebar_state == 'expanded':
@@ -199,12 +510,7 @@ def main():
                 st.session_state.sidebar_state = 'collapsed'
                 st.rerun()
             
-            categories = {
-                "Car & Motorbike": "products_car_&_motorbike.csv",
-                "Electronics": "products_electronics.csv",
-                "Sports, Fitness & Outdoors": "products_sports,_fitness_&_outdoors.csv",
-                "Tools & Home Improvement": "products_tools_&_home_improvement.csv"
-            }
+            categories = CATEGORIES
             for category in categories.keys():
                 is_active = (st.session_state.selected_category == category)
                 button_class = "active" if is_active else ""
@@ -219,7 +525,20 @@ def main():
                 if st.button(category, use_container_width=True, key=category, type="secondary"):
                     st.session_state.selected_category = category
                     st.session_state.product_pointer = 0
+                    st.session_state.view = "browse"
                     st.rerun()
+            if st.button("🔎 Search all categories", use_container_width=True, key="open_query"):
+                st.session_state.view = "query"
+                st.rerun()
+
+            if WARMUP:
+                warming = any(frame_store().status(path) != "ready" for path in categories.values())
+                if warming and hasattr(st, "fragment"):
+                    # Refresh just the progress display until every category is ready.
+                    st.fragment(run_every=2)(render_warmup_status)()
+                else:
+                    render_warmup_status()
+            render_scoring_rules_editor()
         else: # Collapsed state
             if st.button("▶", use_container_width=True, key="expand"):
                 st.session_state.sidebar_state = 'expanded'
@@ -227,9 +546,16 @@ def main():
         st.markdown("</div>", unsafe_allow_html=True)
 
     with main_content:
+        if st.session_state.view == "query":
+            render_query_view()
+            return
+
         selected_category_name = st.session_state.selected_category
-        file_name = f"products_{selected_category_name.replace(', ', '_').replace(' & ', '_').lower()}.csv"
-        df = load_and_process_data(file_name)
+        file_name = CATEGORIES[selected_category_name]
+        if loads_progressively(file_name):
+            df = load_progressive_category(file_name)
+        else:
+            df = load_and_process_data(file_name)
         
         if df is None:
             st.error(f"File not found: '{file_name}'. Please ensure it is in your GitHub repository.")
@@ -242,12 +568,31 @@ def main():
             st.session_state.shuffled_indices = indices
             st.session_state.product_pointer = 0
 
-        st.caption(f"Loaded {len(df)} products for {selected_category_name}.")
-        st.divider()
-        
         current_shuffled_index = st.session_state.product_pointer
         current_product_index = st.session_state.shuffled_indices[current_shuffled_index]
-        current_product = df.iloc[current_product_index]
+        if isinstance(df, ProgressiveCategory):
+            nearby = [(current_shuffled_index + offset) % len(df) for offset in range(-1, LOOKAHEAD + 1)]
+            current_product = df.product(current_product_index)
+            df.prioritize([st.session_state.shuffled_indices[pointer] for pointer in nearby])
+        else:
+            current_product = df.iloc[current_product_index]
+
+        # Stored frames are scored with the built-in rules; any other rule set
+        # is applied on top without touching them.
+        rules = compiled_rules(st.session_state.scoring_rules)
+        custom_rules = rules.key != ScoringRules().key
+        if custom_rules:
+            current_product = current_product.copy()
+            if isinstance(df, ProgressiveCategory):
+                current_product[SCORE_COLUMNS] = rules.score_row(current_product)
+            else:
+                current_product[SCORE_COLUMNS] = category_scores(file_name, df, rules).iloc[current_product_index].to_numpy()
+
+        st.caption(f"Loaded {len(df)} products for {selected_category_name}."
+                   + (" Scored with custom rules." if custom_rules else ""))
+        if isinstance(df, ProgressiveCategory) and not df.is_complete:
+            st.caption(f"Scoring product images in the background: {df.scored_count}/{len(df)} done.")
+        st.divider()
 
         col1, col2 = st.columns([2, 3], gap="large")
         with col1:
@@ -272,8 +617,9 @@ def main():
                 metric_col2.metric(label="📈 Monthly Sales", value=clean_sales_text(current_product.get('Monthly Sales', 'N/A')))
                 
                 st.markdown("### ⭐ Rating")
-                st.markdown(f"<h2 style='color: #212121; font-weight: 600;'>{get_rating_stars(current_product.get('Ratings', 'N/A'))}</h2>", unsafe_allow_html=True)
-                st.markdown(f"Based on **{int(current_product.get('Review', 0)):,}** reviews.")
+                st.markdown(f"<h2 style='color: #212121; font-weight: 600;'>{get_rating_stars(rating_text(current_product))}</h2>", unsafe_allow_html=True)
+                reviews = current_product.get('Review')
+                st.markdown(f"Based on **{f'{int(reviews):,}' if pd.notna(reviews) else 'N/A'}** reviews.")
                 st.divider()
 
                 st.subheader("📊 PRISM Analysis")
@@ -312,5 +658,7 @@ def main():
                 st.link_button("Search for Suppliers on Indiamart ↗", url=indiamart_url, use_container_width=True)
                 st.markdown("</div>", unsafe_allow_html=True)
 
+        render_diagnostics(pipeline_metrics().get(file_name), file_name)
+
 if __name__ == "__main__":
     main()
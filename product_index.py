@@ -0,0 +1,201 @@
+# File: product_index.py
+"""
+Query layer over every processed category.
+
+`ProductIndex` stacks the categories into one table and precomputes:
+
+- a sorted order for each of `SORT_COLUMNS`, so range filters are two binary
+  searches and top-K by a column is a slice;
+- an inverted index from `Identified Item` tokens to rows, so keyword lookups
+  only touch the matching rows;
+- row lists per Potential label and per category.
+
+A query intersects the smallest candidate row lists first and only gathers the
+columns of the rows on the requested page.
+
+    python product_index.py "bottle" --potential "High Potential" --max-price 350
+"""
+import argparse
+import glob
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from precompute import load_artifact
+
+SORT_COLUMNS = ['PRISM Score', 'Price', 'Cleaned Sales', 'Review']
+RESULT_COLUMNS = ['Category', 'Title', 'Identified Item', 'Price', 'PRISM Score', 'Potential', 'Cleaned Sales',
+                  'Review', 'Listing Quality', 'Missing Data', 'Image']
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text) -> list:
+    return _TOKEN.findall(str(text).lower()) if pd.notna(text) else []
+
+class SortedColumn:
+    """
+    One numeric column in ascending order: `order` holds row ids (NaN rows
+    last), `values` the matching sorted values and `rank` each row's position.
+    """
+    def __init__(self, values: np.ndarray):
+        self.order = np.argsort(values, kind="stable")
+        self.values = values[self.order]
+        self.valid = int(np.count_nonzero(~np.isnan(values)))
+        self.rank = np.empty(len(values), dtype=np.int64)
+        self.rank[self.order] = np.arange(len(values))
+
+    def between(self, low=None, high=None) -> np.ndarray:
+        """
+        Row ids with `low <= value <= high`, found by binary search. Either
+        bound may be None.
+        """
+        valid = self.values[:self.valid]
+        start = 0 if low is None else np.searchsorted(valid, low, side="left")
+        stop = self.valid if high is None else np.searchsorted(valid, high, side="right")
+        return self.order[start:stop]
+
+    def top(self, descending: bool) -> np.ndarray:
+        """
+        Every row id in sort order; NaN rows come last either way.
+        """
+        if not descending:
+            return self.order
+        return np.concatenate([self.order[:self.valid][::-1], self.order[self.valid:]])
+
+    def sort_key(self, rows: np.ndarray, descending: bool) -> np.ndarray:
+        rank = self.rank[rows]
+        return np.where(rank < self.valid, self.valid - 1 - rank, rank) if descending else rank
+
+def _postings(values: pd.Series) -> dict:
+    """
+    `{label: sorted row ids}` for a label column, built from its distinct values.
+    """
+    codes, uniques = pd.factorize(values)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    return {label: order[bounds[i]:bounds[i + 1]] for i, label in enumerate(uniques)}
+
+class ProductIndex:
+    def __init__(self, frames: dict):
+        """
+        `frames` maps a category name to its processed frame. Frames are
+        copied into the index, so they may be evicted or replaced afterwards.
+        """
+        parts = []
+        for category, df in frames.items():
+            if df is None or df.empty:
+                continue
+            part = pd.DataFrame({column: df[column].to_numpy() if column in df else None
+                                 for column in RESULT_COLUMNS if column != 'Category'})
+            part.insert(0, 'Category', category)
+            part['Row'] = np.arange(len(df))
+            parts.append(part)
+        self.table = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=RESULT_COLUMNS + ['Row'])
+        self.table['Category'] = self.table['Category'].astype('category')
+
+        self.sorted = {
+            column: SortedColumn(pd.to_numeric(self.table[column], errors="coerce").to_numpy(dtype=np.float64))
+            for column in SORT_COLUMNS
+        }
+        self.potential = _postings(self.table['Potential'])
+        self.categories = _postings(self.table['Category'])
+        # Tokenize each distinct item name once, then map its rows to every token.
+        self.tokens = {}
+        for item, rows in _postings(self.table['Identified Item']).items():
+            for token in set(tokenize(item)):
+                self.tokens.setdefault(token, []).append(rows)
+        self.tokens = {token: np.sort(np.concatenate(rows)) for token, rows in self.tokens.items()}
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory held by the index: its table, sorted orders and row lists.
+        """
+        arrays = [array for column in self.sorted.values() for array in (column.order, column.values, column.rank)]
+        arrays += [*self.potential.values(), *self.categories.values(), *self.tokens.values()]
+        return int(self.table.memory_usage(index=True, deep=True).sum()) + sum(array.nbytes for array in arrays)
+
+    def _labelled(self, postings: dict, labels) -> np.ndarray:
+        rows = [postings[label] for label in labels if label in postings]
+        return np.sort(np.concatenate(rows)) if rows else np.empty(0, dtype=np.int64)
+
+    def candidates(self, keywords: str = "", potential=None, categories=None, ranges: dict = None) -> np.ndarray:
+        """
+        Sorted row ids matching every filter, or None if there are no filters.
+        Keywords must all appear as tokens of the identified item; `ranges`
+        maps a column of `SORT_COLUMNS` to inclusive `(low, high)` bounds.
+        """
+        row_sets = [self.tokens.get(token, np.empty(0, dtype=np.int64)) for token in set(tokenize(keywords))]
+        if potential:
+            row_sets.append(self._labelled(self.potential, potential))
+        if categories is not None:
+            row_sets.append(self._labelled(self.categories, categories))
+        for column, (low, high) in (ranges or {}).items():
+            if low is not None or high is not None:
+                row_sets.append(np.sort(self.sorted[column].between(low, high)))
+        if not row_sets:
+            return None
+        row_sets.sort(key=len)
+        rows = row_sets[0]
+        for other in row_sets[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def query(self, keywords: str = "", potential=None, categories=None, ranges: dict = None,
+              sort_by: str = 'PRISM Score', descending: bool = True, offset: int = 0, limit: int = 50) -> tuple:
+        """
+        Returns `(page, total)`: the `limit` matching products after `offset`,
+        ordered by `sort_by`, and the number of matches. `page` keeps each
+        product's category and its row in the category frame.
+        """
+        rows = self.candidates(keywords, potential, categories, ranges)
+        column = self.sorted[sort_by]
+        if rows is None:
+            total = len(self.table)
+            page = column.top(descending)[offset:offset + limit]
+        else:
+            total = len(rows)
+            keys = column.sort_key(rows, descending)
+            end = min(offset + limit, total)
+            if end < total:
+                # Only the rows up to the end of the page need ordering.
+                head = np.argpartition(keys, end - 1)[:end] if end else np.empty(0, dtype=np.int64)
+                rows, keys = rows[head], keys[head]
+            page = rows[np.argsort(keys, kind="stable")][offset:end]
+        return self.table.iloc[page].reset_index(drop=True), total
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the precomputed artifacts of every products_*.csv.")
+    parser.add_argument("keywords", nargs="?", default="", help="words the identified item must contain")
+    parser.add_argument("--potential", action="append", help="Potential label to keep (repeatable)")
+    parser.add_argument("--min-price", type=float)
+    parser.add_argument("--max-price", type=float)
+    parser.add_argument("--min-score", type=float)
+    parser.add_argument("--sort-by", choices=SORT_COLUMNS, default='PRISM Score')
+    parser.add_argument("--ascending", action="store_true")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    frames = {path: load_artifact(path) for path in sorted(glob.glob("products_*.csv"))}
+    missing = [path for path, df in frames.items() if df is None]
+    if missing:
+        print(f"No current artifact for {', '.join(missing)}; run precompute.py first.")
+    started = time.perf_counter()
+    index = ProductIndex(frames)
+    built = time.perf_counter()
+    page, total = index.query(args.keywords, potential=args.potential,
+                              ranges={'Price': (args.min_price, args.max_price), 'PRISM Score': (args.min_score, None)},
+                              sort_by=args.sort_by, descending=not args.ascending, limit=args.limit)
+    queried = time.perf_counter()
+    print(page[['Category', 'Identified Item', 'Price', 'PRISM Score', 'Potential']].to_string())
+    print(f"{total} matches in {len(index)} products "
+          f"(index built in {(built - started) * 1000:.0f} ms, query {(queried - built) * 1000:.2f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+# File: progressive_loader.py
+import collections
+import heapq
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from compact_frame import compact_products, memory_report, report_details
+from data_pipeline import clean_products, read_products
+from frame_store import frame_nbytes
+from item_identifier import ItemIdentifier
+from listing_quality_evaluator import ListingQualityEvaluator
+from pipeline_metrics import PipelineMetrics
+from prism_score_evaluator import PrismScoreEvaluator
+
+class ProgressiveCategory:
+    """
+    A category frame that is usable before every image has been scored.
+
+    Cleaning and item identification run up front because they are cheap.
+    Listing quality, and with it the PRISM score, is filled in by a background
+    thread `batch_size` rows at a time. `product` scores a row on the spot if
+    the worker has not reached it yet, and `prioritize` moves rows to the front
+    of the worker's queue.
+
+    A row whose image could not be rated shows as "Error" for now, but stays
+    unscored. The worker tries it again after `retry_backoff_s`, doubling the
+    wait each time. The "Error" is only kept once `retry_attempts` tries have
+    failed, so a short CDN outage does not lower any score for good.
+
+    With `compact` on, the frame is kept in the compact layout of
+    `compact_frame.py`, except for the columns the worker fills in.
+    """
+    _score_columns = ['PRISM Score', 'Potential', 'Missing Data']
+
+    def __init__(self, df: pd.DataFrame, quality_engine: ListingQualityEvaluator = None,
+                 score_engine: PrismScoreEvaluator = None, batch_size: int = 64,
+                 metrics: PipelineMetrics = None, retry_attempts: int = 5, retry_backoff_s: float = 5.0,
+                 compact: bool = False):
+        self.quality_engine = quality_engine or ListingQualityEvaluator()
+        self.score_engine = score_engine or PrismScoreEvaluator()
+        self.batch_size = batch_size
+        self.metrics = metrics or PipelineMetrics()
+        self.retry_attempts = retry_attempts
+        self.retry_backoff_s = retry_backoff_s
+
+        df = df.reset_index(drop=True)
+        df['Listing Quality'] = pd.Series(None, index=df.index, dtype=object)
+        df[self._score_columns] = self.score_engine.score_frame(df)
+        if compact:
+            with self.metrics.stage("compact", rows=len(df)):
+                compacted = compact_products(df, keep=['Listing Quality', *self._score_columns])
+            self.metrics.record_detail("memory_by_column", report_details(memory_report(df, compacted)))
+            df = compacted
+        self._df = df
+        self._scored = np.zeros(len(df), dtype=bool)
+        self._attempts = np.zeros(len(df), dtype=np.int16)
+        # (due time, position) of failed rows waiting to be tried again.
+        self._retries = []
+        self._priority = collections.deque()
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._wakeup = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="progressive-scoring", daemon=True)
+        self._worker.start()
+
+    @classmethod
+    def from_csv(cls, csv_path: str, metrics: PipelineMetrics = None, **kwargs):
+        """
+        Cleans and identifies a category CSV and starts scoring it in the
+        background. Returns None if the file is missing.
+        """
+        metrics = metrics or PipelineMetrics()
+        try:
+            with metrics.stage("read_csv") as stage:
+                df = read_products(csv_path)
+                stage["rows"] = len(df)
+        except FileNotFoundError: return None
+        with metrics.stage("clean", rows=len(df)):
+            clean_products(df)
+        with metrics.stage("identify", rows=len(df)):
+            df['Identified Item'] = ItemIdentifier().identify_many(df['Title'])
+        return cls(df, metrics=metrics, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._df)
+
+    @property
+    def index(self) -> pd.Index:
+        return self._df.index
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return frame_nbytes(self._df)
+
+    def close(self):
+        """
+        Stops the background worker; rows it has not scored stay unscored.
+        """
+        self._closed = True
+        self._wakeup.set()
+
+    @property
+    def scored_count(self) -> int:
+        return int(self._scored.sum())
+
+    @property
+    def is_complete(self) -> bool:
+        return bool(self._scored.all())
+
+    def product(self, position: int) -> pd.Series:
+        """
+        Returns the fully scored row at `position`, scoring it now if needed.
+        The image fetch is a foreground one, so an unreachable CDN is reported
+        at once instead of holding up the page.
+        """
+        self._score_positions([position], foreground=True)
+        with self._lock:
+            return self._df.iloc[position].copy()
+
+    def prioritize(self, positions):
+        """
+        Asks the background worker to score these rows next.
+        """
+        with self._lock:
+            self._priority.extendleft(reversed([p for p in positions if self._is_new(p)]))
+        self._wakeup.set()
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Returns a snapshot of the frame; rows not yet scored have no listing quality.
+        """
+        with self._lock:
+            return self._df.copy()
+
+    def _is_new(self, position) -> bool:
+        # Neither scored nor waiting for a retry.
+        return not self._scored[position] and not self._attempts[position]
+
+    def _score_positions(self, positions, foreground: bool = False, retry: bool = False):
+        """
+        Rates and scores `positions`. Rows that failed before are skipped
+        unless `retry` is set, so only the worker retries them, on schedule.
+        """
+        with self._lock:
+            positions = [p for p in dict.fromkeys(positions)
+                         if not self._scored[p] and (retry or not self._attempts[p])]
+            urls = self._df['Image'].iloc[positions].tolist()
+        if not positions:
+            return
+        with self.metrics.stage("listing_quality", rows=len(positions)):
+            labels = self.quality_engine.get_scores(urls, metrics=self.metrics, foreground=foreground)
+        with self._lock, self.metrics.stage("score", rows=len(positions)):
+            rows = self._df.index[positions]
+            self._df.loc[rows, 'Listing Quality'] = labels
+            self._df.loc[rows, self._score_columns] = self.score_engine.score_frame(self._df.loc[rows])
+            positions = np.asarray(positions)
+            failed = np.array([label == "Error" and isinstance(url, str) and bool(url)
+                               for url, label in zip(urls, labels)], dtype=bool)
+            self._attempts[positions[failed]] += 1
+            final = ~failed | (self._attempts[positions] >= self.retry_attempts)
+            self._scored[positions[final]] = True
+            self._schedule_retries(positions[~final])
+
+    def _schedule_retries(self, positions):
+        # Called with the lock held.
+        now = time.monotonic()
+        for position in positions:
+            due = now + self.retry_backoff_s * 2 ** max(0, int(self._attempts[position]) - 1)
+            heapq.heappush(self._retries, (due, int(position)))
+        if len(positions):
+            self.metrics.count("image_retries_scheduled", len(positions))
+
+    def _next_batch(self) -> tuple:
+        """
+        Returns `(positions, retry)`: failed rows that are due again, or else
+        the next rows to score for the first time.
+        """
+        with self._lock:
+            batch = []
+            now = time.monotonic()
+            while self._retries and self._retries[0][0] <= now and len(batch) < self.batch_size:
+                position = heapq.heappop(self._retries)[1]
+                if not self._scored[position]:
+                    batch.append(position)
+            if batch:
+                return batch, True
+            while self._priority and len(batch) < self.batch_size:
+                position = self._priority.popleft()
+                if self._is_new(position):
+                    batch.append(position)
+            while self._cursor < len(self._scored) and len(batch) < self.batch_size:
+                if self._is_new(self._cursor):
+                    batch.append(self._cursor)
+                self._cursor += 1
+            return batch, False
+
+    def _run(self):
+        while not self._closed:
+            batch, retry = self._next_batch()
+            if batch:
+                try:
+                    self._score_positions(batch, retry=retry)
+                except Exception:
+                    # The rows stay unscored. New rows are retried by `product`
+                    # on demand; rows already waiting for a retry wait again.
+                    if retry:
+                        with self._lock:
+                            self._schedule_retries(batch)
+            elif self.is_complete:
+                return
+            else:
+                # Everything left is being scored by `product` or waiting for a
+                # retry; wait for a prioritize call or the next retry.
+                self._wakeup.wait(timeout=1)
+                self._wakeup.clear()
@@ -0,0 +1,227 @@
+# File: scoring_rules.py
+"""
+Declarative PRISM scoring rules.
+
+A rule set is a JSON-serializable dict. Each criterion scores one column with
+bands of `gt`/`gte`/`lt`/`lte` bounds (first matching band wins, `default`
+otherwise) or, for labels, a `categories` mapping. A criterion is missing, and
+its `max_points` left out of the total, when the value is NaN or, compared
+without case or surrounding spaces, one of its `missing` values; `present_if`
+names the column that check runs on instead. `potential` maps the final score
+to a label the same way.
+
+Rules are compiled once into sorted bin edges, so scoring a whole category is
+a `searchsorted` per criterion.
+
+    python scoring_rules.py > my_rules.json   # print the default rule set
+"""
+import bisect
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+# Reproduces the original hard-coded scoring, gaps included: a price of 199.5,
+# a rating of 4.195 or a review count of 99.5 falls in no band.
+DEFAULT_RULES = {
+    "criteria": [
+        {"name": "Price", "column": "Price", "max_points": 4, "default": 0, "bands": [
+            {"gte": 200, "lte": 350, "points": 4},
+            {"gte": 175, "lte": 199, "points": 2},
+            {"gt": 350, "points": 2},
+            {"lt": 175, "points": 1},
+        ]},
+        {"name": "Reviews", "column": "Review", "max_points": 3, "default": 1, "bands": [
+            {"gte": 100, "points": 3},
+            {"gte": 50, "lte": 99, "points": 2},
+        ]},
+        {"name": "Rating", "column": "Ratings_Num", "max_points": 3, "default": 0, "bands": [
+            {"gte": 4.2, "points": 3},
+            {"gte": 3.6, "lte": 4.19, "points": 2},
+            {"gte": 3.0, "lte": 3.59, "points": 1},
+        ]},
+        # Inverted: a poor listing is an opportunity.
+        {"name": "Listing Quality", "column": "Listing Quality", "max_points": 2, "default": 0,
+         "missing": ["Error"], "categories": {"Poor": 2, "Average": 1, "Good": 1}},
+        {"name": "Monthly Sales", "column": "Cleaned Sales", "present_if": "Monthly Sales",
+         "missing": ["n/a"], "max_points": 3, "default": 1, "bands": [
+            {"gte": 500, "points": 3},
+            {"gte": 100, "lte": 499, "points": 2},
+        ]},
+    ],
+    "potential": {"default": "Low Potential", "bands": [
+        {"gt": 80, "label": "High Potential"},
+        {"gte": 66, "label": "Moderate Potential"},
+    ]},
+}
+
+def load_rules(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def rules_key(rules: dict) -> str:
+    """
+    A short fingerprint of a rule set, for caching what was scored with it.
+    """
+    return hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()[:16]
+
+def _points(value, where: str) -> int:
+    """
+    `value` as whole points. Fractions are rejected rather than truncated, so
+    array and single-row scoring cannot disagree.
+    """
+    try:
+        points = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{where} must be a number of points, not {value!r}") from None
+    if not points.is_integer():
+        raise ValueError(f"{where} must be a whole number of points, not {value!r}")
+    return int(points)
+
+def _band_interval(band: dict) -> tuple:
+    """
+    The band as a half-open interval [lo, hi) of floats. Inclusive and
+    exclusive bounds are moved to the next representable float, so the
+    interval holds exactly the values the comparisons would accept.
+    """
+    lo, hi = -np.inf, np.inf
+    if "gte" in band: lo = float(band["gte"])
+    if "gt" in band: lo = np.nextafter(float(band["gt"]), np.inf)
+    if "lte" in band: hi = np.nextafter(float(band["lte"]), np.inf)
+    if "lt" in band: hi = float(band["lt"])
+    return lo, hi
+
+class Bins:
+    """
+    A piecewise-constant lookup compiled from bands: `edges` are the sorted
+    left ends of the elementary intervals and `values` the result in each.
+    NaN looks up `default`.
+    """
+    def __init__(self, bands, value_key: str, default):
+        intervals = []
+        for band in bands:
+            if value_key not in band:
+                raise ValueError(f"Band {band} has no {value_key!r}")
+            unknown = set(band) - {"gt", "gte", "lt", "lte", value_key}
+            if unknown:
+                raise ValueError(f"Band {band} has unknown keys {sorted(unknown)}")
+            value = band[value_key] if isinstance(default, str) else _points(band[value_key], f"Band {band}")
+            intervals.append((*_band_interval(band), value))
+        edges = sorted({-np.inf} | {edge for lo, hi, _ in intervals for edge in (lo, hi) if np.isfinite(edge)})
+        # Every value in an elementary interval matches the same bands as its left end.
+        values = [next((value for lo, hi, value in intervals if lo <= left < hi), default) for left in edges]
+        self.edges = np.array(edges, dtype=np.float64)
+        self.values = np.array(values, dtype=object if isinstance(default, str) else np.int64)
+        self.default = default
+        self._edge_list, self._value_list = edges, values
+
+    def lookup(self, x: np.ndarray) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float64)
+        result = self.values[np.searchsorted(self.edges, x, side="right") - 1]
+        return np.where(np.isnan(x), self.default, result).astype(self.values.dtype)
+
+    def lookup_one(self, x):
+        """
+        `lookup` for a single value, without building arrays.
+        """
+        if pd.isna(x):
+            return self.default
+        return self._value_list[bisect.bisect_right(self._edge_list, float(x)) - 1]
+
+class Criterion:
+    def __init__(self, rule: dict):
+        self.name = rule.get("name", rule["column"])
+        self.column = rule["column"]
+        self.present_if = rule.get("present_if")
+        self.missing = {str(value).strip().lower() for value in rule.get("missing", [])}
+        self.max_points = _points(rule["max_points"], f"Criterion {self.name!r} max_points")
+        default = _points(rule.get("default", 0), f"Criterion {self.name!r} default")
+        if ("bands" in rule) == ("categories" in rule):
+            raise ValueError(f"Criterion {self.name!r} needs exactly one of 'bands' or 'categories'")
+        self.bins = Bins(rule["bands"], "points", default) if "bands" in rule else None
+        self.categories = {label: _points(points, f"Criterion {self.name!r} category {label!r}")
+                           for label, points in rule.get("categories", {}).items()}
+        self.default = default
+
+    def score(self, df: pd.DataFrame) -> tuple:
+        """
+        Returns `(points, present)` arrays for every row.
+        """
+        nan_column = pd.Series(np.nan, index=df.index)
+        values = df.get(self.column, nan_column)
+        presence = df.get(self.present_if, nan_column) if self.present_if else values
+        present = presence.notna().to_numpy()
+        if self.missing:
+            # Normalize each distinct value once rather than every row.
+            codes, uniques = pd.factorize(presence)
+            is_missing = np.array([str(value).strip().lower() in self.missing for value in uniques], dtype=bool)
+            present &= ~np.append(is_missing, False)[codes]
+        if self.bins is not None:
+            points = self.bins.lookup(values.to_numpy(dtype=float, na_value=np.nan))
+        else:
+            points = values.astype(object).map(self.categories).fillna(self.default).to_numpy(dtype=np.int64)
+        return np.where(present, points, 0), present
+
+    def score_one(self, product) -> tuple:
+        """
+        `score` for a single product row (a Series or dict): `(points, present)`.
+        """
+        value = product.get(self.column)
+        presence = product.get(self.present_if) if self.present_if else value
+        if pd.isna(presence) or (self.missing and str(presence).strip().lower() in self.missing):
+            return 0, False
+        if self.bins is not None:
+            return self.bins.lookup_one(value), True
+        return self.categories.get(value, self.default), True
+
+class ScoringRules:
+    """
+    A compiled rule set. `score_frame` returns 'PRISM Score', 'Potential' and
+    'Missing Data' for every row of a processed frame.
+    """
+    def __init__(self, rules: dict = None):
+        self.rules = DEFAULT_RULES if rules is None else rules
+        try:
+            self.criteria = [Criterion(rule) for rule in self.rules["criteria"]]
+            potential = self.rules["potential"]
+            self.potential = Bins(potential["bands"], "label", str(potential["default"]))
+        except (KeyError, TypeError) as error:
+            raise ValueError(f"Malformed scoring rules: {error!r}") from error
+        self.key = rules_key(self.rules)
+
+    def score_row(self, product) -> tuple:
+        """
+        Scores one product row: `(score, potential, missing_data)`.
+        """
+        points_earned = points_available = 0
+        missing_data = False
+        for criterion in self.criteria:
+            points, present = criterion.score_one(product)
+            points_earned += points
+            points_available += criterion.max_points if present else 0
+            missing_data |= not present
+        final_score = int((points_earned / points_available) * 100) if points_available > 0 else 0
+        return final_score, self.potential.lookup_one(final_score), missing_data
+
+    def score_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        points_earned = np.zeros(len(df), dtype=np.int64)
+        points_available = np.zeros(len(df), dtype=np.int64)
+        missing_data = np.zeros(len(df), dtype=bool)
+        for criterion in self.criteria:
+            points, present = criterion.score(df)
+            points_earned += points
+            points_available += np.where(present, criterion.max_points, 0)
+            missing_data |= ~present
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(points_available > 0, points_earned / points_available, 0.0)
+        final_score = np.trunc(ratio * 100).astype(np.int64)
+        return pd.DataFrame({
+            'PRISM Score': final_score,
+            'Potential': self.potential.lookup(final_score),
+            'Missing Data': missing_data,
+        }, index=df.index)
+
+if __name__ == "__main__":
+    print(json.dumps(DEFAULT_RULES, indent=2))
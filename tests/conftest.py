@@ -0,0 +1,6 @@
+# File: tests/conftest.py
+import os
+import sys
+
+# The app's modules live at the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,66 @@
+# File: tests/test_download_scheduler.py
+"""
+Foreground fetches must not queue behind background batches for a host's
+concurrency slots, and background fetches must not wait for a slot past
+their `max_wait_s`.
+"""
+import threading
+import time
+
+import pytest
+
+from download_scheduler import DownloadScheduler, HostBusyError
+
+URL = "https://images.example/photo.jpg"
+
+class Response:
+    status_code = 200
+    headers = {}
+
+    def close(self):
+        pass
+
+class SlowSession:
+    """
+    Answers every GET after `latency_s`.
+    """
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+
+    def get(self, url, **kwargs):
+        time.sleep(self.latency_s)
+        return Response()
+
+def saturate(scheduler, session, count: int) -> list:
+    """
+    Starts `count` background fetches and returns once the host's slots are full.
+    """
+    threads = [threading.Thread(target=scheduler.get, args=(session, URL)) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    limit, _ = scheduler.host(URL)
+    while limit.in_flight < int(limit.limit):
+        time.sleep(0.01)
+    return threads
+
+def test_foreground_skips_busy_slots():
+    scheduler = DownloadScheduler(initial_limit=2)
+    session = SlowSession(latency_s=1.0)
+    threads = saturate(scheduler, session, 8)
+    started = time.monotonic()
+    assert scheduler.get(session, URL, foreground=True).status_code == 200
+    assert time.monotonic() - started < session.latency_s * 1.5
+    for thread in threads:
+        thread.join()
+
+def test_background_slot_wait_honours_max_wait():
+    scheduler = DownloadScheduler(initial_limit=1)
+    session = SlowSession(latency_s=1.0)
+    threads = saturate(scheduler, session, 1)
+    started = time.monotonic()
+    with pytest.raises(HostBusyError):
+        scheduler.get(session, URL, max_wait_s=0.2)
+    assert time.monotonic() - started < 0.8
+    for thread in threads:
+        thread.join()
+    assert scheduler.host(URL)[0].in_flight == 0
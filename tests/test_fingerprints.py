@@ -0,0 +1,52 @@
+# File: tests/test_fingerprints.py
+"""
+Row fingerprints must not depend on how a CSV is read, so rows processed in
+chunks match the rows of a previous whole-file run and reuse its results.
+"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_pipeline import iter_processed_chunks, process_csv, read_products, row_fingerprints
+from pipeline_metrics import PipelineMetrics
+from precompute import previous_results_lookup, write_artifact
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_PATHS = sorted(glob.glob(os.path.join(REPO_DIR, "products_*.csv")))
+
+class FakeQuality:
+    """
+    Rates every image without downloading it; "Error" on every third call.
+    """
+    def __init__(self):
+        self.rated = 0
+
+    def get_scores(self, urls, metrics=None):
+        labels = np.array(['Good', 'Average', 'Error'], dtype=object)
+        scores = labels[(np.arange(len(urls)) + self.rated) % 3]
+        self.rated += len(urls)
+        return list(scores)
+
+@pytest.mark.parametrize("csv_path", CSV_PATHS, ids=os.path.basename)
+def test_chunked_fingerprints_match_whole_file(csv_path):
+    whole = row_fingerprints(read_products(csv_path))
+    chunked = pd.concat([row_fingerprints(chunk) for chunk in read_products(csv_path, chunk_rows=500)],
+                        ignore_index=True)
+    assert whole.tolist() == chunked.tolist()
+
+@pytest.mark.parametrize("csv_path", CSV_PATHS[:1], ids=os.path.basename)
+def test_chunked_run_reuses_whole_file_artifact(csv_path, tmp_path):
+    previous = process_csv(csv_path, quality_engine=FakeQuality())
+    write_artifact(previous, csv_path, str(tmp_path))
+    metrics = PipelineMetrics()
+    quality = FakeQuality()
+    chunks = list(iter_processed_chunks(csv_path, 500, metrics=metrics, quality_engine=quality,
+                                        previous=previous_results_lookup(csv_path, str(tmp_path))))
+    rated = previous.loc[previous['Listing Quality'] != "Error", 'Row Fingerprint']
+    reusable = int(previous['Row Fingerprint'].isin(rated).sum())
+    assert metrics.counters["rows_reused"] == reusable
+    assert quality.rated == len(previous) - reusable
+    assert sum(len(chunk) for chunk in chunks) == len(previous)
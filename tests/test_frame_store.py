@@ -0,0 +1,33 @@
+# File: tests/test_frame_store.py
+"""
+Entries derived from a category, such as its scores under a rule set, must
+not outlive the category frame they were computed from.
+"""
+import pandas as pd
+
+from frame_store import FrameStore
+
+def frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({"Price": range(rows)})
+
+def test_child_evicted_with_parent():
+    store = FrameStore()
+    store.get("a.csv", lambda key: frame(10))
+    store.get("a.csv#scores:x", lambda key: frame(10), parent="a.csv")
+    store.evict("a.csv")
+    assert "a.csv#scores:x" not in store
+    assert store.stats()["frames"] == {}
+
+def test_child_evicted_with_lru_parent():
+    one = int(frame(1000).memory_usage(index=True, deep=True).sum())
+    store = FrameStore(budget_bytes=3 * one)
+    store.get("a.csv", lambda key: frame(1000))
+    store.get("a.csv#scores:x", lambda key: frame(1000), parent="a.csv")
+    store.get("b.csv", lambda key: frame(1000))
+    store.get("c.csv", lambda key: frame(1000))
+    assert list(store.stats()["frames"]) == ["b.csv", "c.csv"]
+
+def test_child_not_stored_without_parent():
+    store = FrameStore()
+    assert len(store.get("a.csv#scores:x", lambda key: frame(10), parent="a.csv")) == 10
+    assert "a.csv#scores:x" not in store
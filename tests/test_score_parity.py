@@ -0,0 +1,140 @@
+# File: tests/test_score_parity.py
+"""
+PrismScoreEvaluator must score exactly like the original row-wise code, both
+through `score_frame` and `get_score`, on every category CSV and at the edges
+of every band.
+"""
+import copy
+import glob
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compact_frame import compact_products
+from data_pipeline import clean_products, read_products
+from prism_score_evaluator import PrismScoreEvaluator
+from scoring_rules import DEFAULT_RULES, ScoringRules
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_PATHS = sorted(glob.glob(os.path.join(REPO_DIR, "products_*.csv")))
+LISTING_QUALITIES = ["Poor", "Average", "Good", "Error", None]
+
+def legacy_score(product_data: pd.Series) -> (int, str, bool):
+    """
+    The original hard-coded PrismScoreEvaluator.get_score, kept as the reference.
+    """
+    points_earned, points_available, missing_data = 0, 15, False
+
+    price = product_data.get('Price')
+    if pd.notna(price):
+        if 200 <= price <= 350: points_earned += 4
+        elif (175 <= price <= 199) or (price > 350): points_earned += 2
+        elif price < 175: points_earned += 1
+    else:
+        points_available -= 4; missing_data = True
+
+    reviews = product_data.get('Review')
+    if pd.notna(reviews):
+        if reviews >= 100: points_earned += 3
+        elif 50 <= reviews <= 99: points_earned += 2
+        else: points_earned += 1
+    else: points_available -= 3; missing_data = True
+
+    rating = product_data.get('Ratings_Num')
+    if pd.notna(rating):
+        if rating >= 4.2: points_earned += 3
+        elif 3.6 <= rating <= 4.19: points_earned += 2
+        elif 3.0 <= rating <= 3.59: points_earned += 1
+    else: points_available -= 3; missing_data = True
+
+    quality = product_data.get('Listing Quality')
+    if pd.notna(quality) and quality != "Error":
+        if quality == 'Poor': points_earned += 2
+        elif quality == 'Average' or quality == 'Good': points_earned += 1
+    else: points_available -= 2; missing_data = True
+
+    original_sales = product_data.get('Monthly Sales')
+    cleaned_sales = product_data.get('Cleaned Sales')
+    if pd.isna(original_sales) or original_sales.strip().lower() == 'n/a':
+        points_available -= 3
+        missing_data = True
+    else:
+        if cleaned_sales >= 500: points_earned += 3
+        elif 100 <= cleaned_sales <= 499: points_earned += 2
+        else:
+            points_earned += 1
+
+    final_score = int((points_earned / points_available) * 100) if points_available > 0 else 0
+
+    if final_score > 80: potential_label = "High Potential"
+    elif final_score >= 66: potential_label = "Moderate Potential"
+    else: potential_label = "Low Potential"
+
+    return final_score, potential_label, missing_data
+
+def category_frame(csv_path: str) -> pd.DataFrame:
+    df = clean_products(read_products(csv_path))
+    # Listing quality needs image downloads; cycle through every label instead.
+    df['Listing Quality'] = [LISTING_QUALITIES[i % len(LISTING_QUALITIES)] for i in range(len(df))]
+    return df
+
+def boundary_frame() -> pd.DataFrame:
+    """
+    Every combination of values on, just inside and between the band edges,
+    including the gaps the original thresholds leave (199.5, 99.5, 4.195).
+    """
+    prices = [0, 174, 174.5, 175, 199, 199.5, 200, 350, 350.5, np.nan]
+    reviews = [0, 49, 50, 99, 99.5, 100, np.nan]
+    ratings = [1.0, 2.99, 3.0, 3.59, 3.595, 3.6, 4.19, 4.195, 4.2, 5.0, np.nan]
+    sales = [("N/A", 0), (" n/a ", 0), (np.nan, 0), ("50+ bought", 99), ("100+ bought", 100),
+             ("400+ bought", 499), ("400+ bought", 499.5), ("500+ bought", 500)]
+    rows = itertools.product(prices, reviews, ratings, LISTING_QUALITIES, sales)
+    return pd.DataFrame([
+        {'Price': price, 'Review': review, 'Ratings_Num': rating, 'Listing Quality': quality,
+         'Monthly Sales': monthly, 'Cleaned Sales': cleaned}
+        for price, review, rating, quality, (monthly, cleaned) in rows
+    ])
+
+def legacy_frame(df: pd.DataFrame) -> pd.DataFrame:
+    scores = [legacy_score(row) for _, row in df.iterrows()]
+    return pd.DataFrame(scores, columns=['PRISM Score', 'Potential', 'Missing Data'], index=df.index)
+
+def assert_parity(df: pd.DataFrame):
+    evaluator = PrismScoreEvaluator()
+    expected = legacy_frame(df)
+
+    scored = evaluator.score_frame(df)
+    pd.testing.assert_frame_equal(scored.astype(object), expected.astype(object))
+
+    for index, row in df.iterrows():
+        assert evaluator.get_score(row) == tuple(expected.loc[index]), index
+
+def test_csv_paths_found():
+    assert len(CSV_PATHS) == 4
+
+@pytest.mark.parametrize("csv_path", CSV_PATHS, ids=os.path.basename)
+def test_category_parity(csv_path):
+    assert_parity(category_frame(csv_path))
+
+@pytest.mark.parametrize("csv_path", CSV_PATHS, ids=os.path.basename)
+def test_compact_category_parity(csv_path):
+    df = category_frame(csv_path)
+    pd.testing.assert_frame_equal(PrismScoreEvaluator().score_frame(compact_products(df)),
+                                  PrismScoreEvaluator().score_frame(df))
+
+def test_band_boundary_parity():
+    assert_parity(boundary_frame())
+
+@pytest.mark.parametrize("field", ["band", "max_points", "default"])
+def test_fractional_points_rejected(field):
+    rules = copy.deepcopy(DEFAULT_RULES)
+    price = rules["criteria"][0]
+    if field == "band":
+        price["bands"][0]["points"] = 3.5
+    else:
+        price[field] = 3.5
+    with pytest.raises(ValueError, match="whole number"):
+        ScoringRules(rules)